@@ -2,29 +2,34 @@
 from langchain.tools import Tool
 from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
+from ..llm import get_llm
+from ..llm_cache import get_llm_cache
+from ..prompts import HIPAA_COMPLIANCE_CHECK_PROMPT
+from ..windowing import split_windows, map_windows
+from .phi_detector import detect_phi, assess_phi, ambiguous_excerpts
+import json
+import re
+
+# Verdicts from least to most severe; the local scan and the reviews combine to the worst
+_STATUS_ORDER = ["compliant", "partially_compliant", "non_compliant"]
+_RISK_ORDER = ["low", "medium", "high"]
+
+
+def _worse(current, candidate, order):
+    if candidate not in order:
+        return current
+    return max(current, candidate, key=order.index)
+
 
 class ComplianceAgent:
     """Tool for checking HIPAA compliance of medical data handling"""
     
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4", temperature=0)
+        self.llm = get_llm(model="gpt-4", temperature=0)
         
         self.compliance_prompt = PromptTemplate(
-            input_variables=["data"],
-            template="""
-            You are a HIPAA compliance expert. Review the following medical data and check for:
-            
-            1. Protected Health Information (PHI) that should be handled with care
-            2. Proper patient identifiers
-            3. Compliance risks
-            4. Recommendations for secure handling
-            
-            Data to review:
-            {data}
-            
-            Provide a compliance assessment with specific recommendations:
-            """
+            input_variables=["content"],
+            template=HIPAA_COMPLIANCE_CHECK_PROMPT
         )
         
         self.compliance_chain = LLMChain(
@@ -32,30 +37,86 @@ class ComplianceAgent:
             prompt=self.compliance_prompt
         )
     
-    def check_compliance(self, data):
+    def check_compliance(self, data, use_cache=True, use_llm=True):
         """
         Check if the data handling is HIPAA compliant
         
+        PHI is found by the local scanner; the LLM reviewer only sees the
+        passages around findings the scanner isn't sure about.
+        
         Args:
             data (str or dict): The data to check for compliance
+            use_cache (bool): Set to False to bypass the LLM response cache
+            use_llm (bool): Set to False to rely on the local scanner alone
             
         Returns:
-            dict: Compliance assessment and recommendations
+            dict: Compliance assessment, PHI findings with offsets and recommendations
         """
         # Convert dict to string if needed
         if isinstance(data, dict):
             data_str = str(data)
         else:
             data_str = data
-            
-        assessment = self.compliance_chain.run(data=data_str[:4000])  # Limit to first 4000 chars
+        
+        findings = detect_phi(data_str)
+        phi = assess_phi(findings)
+        excerpts = ambiguous_excerpts(data_str, findings)
+        method = "local"
+        assessment = (
+            f"Local PHI scan: {phi['compliance_status']}, risk {phi['risk_level']}. "
+            f"Found: {', '.join(f'{count} {phi_type}' for phi_type, count in phi['counts'].items()) or 'nothing'}."
+        )
+        
+        # A definite violation doesn't need a second opinion
+        if excerpts and use_llm and phi["compliance_status"] != "non_compliant":
+            method = "local+llm"
+            reviews = map_windows(
+                lambda window: self._review_window(window, use_cache),
+                split_windows("\n...\n".join(excerpts))
+            )
+            for review in reviews:
+                if "error" in review:
+                    # An unreadable review leaves the local verdict as it is
+                    assessment += f"\n\nLLM review could not be parsed: {review['raw_review']}"
+                    continue
+                phi["compliance_status"] = _worse(phi["compliance_status"], review.get("compliance_status"), _STATUS_ORDER)
+                phi["risk_level"] = _worse(phi["risk_level"], review.get("risk_level"), _RISK_ORDER)
+                if review.get("phi_present") in (True, "true"):
+                    phi["phi_present"] = True
+                actions = review.get("recommended_actions")
+                if isinstance(actions, list):
+                    phi["recommended_actions"] += [action for action in actions if action not in phi["recommended_actions"]]
+                assessment += (
+                    f"\n\nLLM review: {review.get('compliance_status', 'unknown')}, "
+                    f"risk {review.get('risk_level', 'unknown')}."
+                )
         
         return {
-            "compliant": "non-compliant" not in assessment.lower(),
+            "compliant": phi["compliance_status"] != "non_compliant",
             "assessment": assessment,
-            "contains_phi": "phi" in assessment.lower() or "protected health information" in assessment.lower()
+            "contains_phi": phi["phi_present"],
+            **phi,
+            "findings": findings,
+            "method": method
         }
     
+    def _review_window(self, window_text, use_cache):
+        result = get_llm_cache().run("compliance", self.compliance_chain, use_cache=use_cache, content=window_text)
+        
+        # Attempt to parse the result as JSON
+        try:
+            # Find JSON in the response (in case there's extra text)
+            json_match = re.search(r'({.*})', result, re.DOTALL)
+            if json_match:
+                result = json_match.group(1)
+            
+            review = json.loads(result)
+            if isinstance(review, dict):
+                return review
+        except json.JSONDecodeError:
+            pass
+        return {"error": "Failed to parse structured review", "raw_review": result}
+    
     def get_tool(self):
         return Tool(
             name="ComplianceChecker",
@@ -2,18 +2,20 @@
 from langchain.tools import Tool
 from langchain.chains import LLMChain, RetrievalQA
 from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
 from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
 from ..embeddings import get_vectorstore
+from ..embedding_model import get_embeddings
+from ..llm import get_llm
+from ..executor import ai_slot
+from ..rate_limit import astream_with_backoff
+from ..windowing import count_tokens
 import json
 
 class DoctorAssistant:
     """Tool for assisting doctors with patient information and medical queries"""
     
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4", temperature=0.2)
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
+        self.llm = get_llm(model="gpt-4", temperature=0.2)
         
         self.qa_prompt = PromptTemplate(
             input_variables=["context", "question"],
@@ -32,6 +34,16 @@ class DoctorAssistant:
             Answer:
             """
         )
+        
+        self.qa_chain = LLMChain(
+            llm=self.llm,
+            prompt=self.qa_prompt
+        )
+    
+    @property
+    def embeddings(self):
+        # Shared per-process model behind the embedding cache
+        return get_embeddings()
     
     def retrieve_patient_records(self, patient_id, query=None):
         """
@@ -110,14 +122,28 @@ class DoctorAssistant:
         Returns:
             str: Response to the doctor's query
         """
-        chain = LLMChain(
-            llm=self.llm,
-            prompt=self.qa_prompt
-        )
-        
-        response = chain.run(context=patient_context, question=query)
+        response = self.qa_chain.run(context=patient_context, question=query)
         return response
     
+    async def stream_medical_answer(self, query, patient_context):
+        """
+        Stream the answer to a doctor's query as it is generated
+        
+        Args:
+            query (str): The doctor's question
+            patient_context (str): Patient information and medical records
+            
+        Yields:
+            str: Pieces of the answer in order
+        """
+        prompt = self.qa_prompt.format(context=patient_context, question=query)
+        # Bounded and paced like every other LLM call: the stream holds an AI
+        # slot while it runs and takes quota (with 429 backoff) when it opens
+        async with ai_slot():
+            async for chunk in astream_with_backoff(lambda: self.llm.astream(prompt), count_tokens(prompt)):
+                if chunk.content:
+                    yield chunk.content
+    
     def get_tools(self):
         return [
             Tool(
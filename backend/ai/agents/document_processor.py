@@ -2,14 +2,20 @@
 from langchain.tools import Tool
 from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
+from ..llm import get_llm
+from ..llm_cache import get_llm_cache
+from ..windowing import first_window
+from .local_classifier import get_local_classifier, DISPLAY_NAMES
 import os
 
 class DocumentClassifier:
     """Tool for classifying medical documents"""
     
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4", temperature=0)
+        self.llm = get_llm(model="gpt-4", temperature=0)
+        self.local_classifier = get_local_classifier()
+        self.local_hits = 0
+        self.llm_calls = 0
         
         self.classification_prompt = PromptTemplate(
             input_variables=["document_text"],
@@ -40,23 +46,61 @@ class DocumentClassifier:
             prompt=self.classification_prompt
         )
     
-    def classify_document(self, document_text):
+    def classify_document(self, document_text, use_cache=True, use_local=True):
         """
         Classify a medical document based on its content
         
+        Routine documents are classified on the CPU in milliseconds; only
+        those the local classifier isn't confident about go to the LLM.
+        
         Args:
             document_text (str): The text content of the document
+            use_cache (bool): Set to False to bypass the LLM response cache
+            use_local (bool): Set to False to always ask the LLM
             
         Returns:
             dict: Classification results with confidence scores
         """
-        classification = self.classification_chain.run(document_text=document_text[:4000])  # Limit to first 4000 chars
+        # The type and identifiers are in the opening window
+        window = first_window(document_text)
+        
+        if use_local:
+            local = self.local_classifier.classify(window)
+            if local["confidence"] >= self.local_classifier.threshold:
+                self.local_hits += 1
+                return {
+                    "result": DISPLAY_NAMES.get(local["document_type"], local["document_type"]),
+                    "document_type": local["document_type"],
+                    "confidence": local["confidence"],
+                    "method": "local"
+                }
+        
+        self.llm_calls += 1
+        classification = get_llm_cache().run(
+            "classifier",
+            self.classification_chain,
+            use_cache=use_cache,
+            document_text=window
+        )
         
         # Extract document type and any identifiers
         # This is a simple implementation - in a real system you'd want to parse the response more carefully
         return {
             "result": classification.strip(),
-            "confidence": 0.85  # Placeholder for a real confidence score
+            "confidence": 0.85,  # Placeholder for a real confidence score
+            "method": "llm"
+        }
+    
+    def stats(self):
+        """
+        Report how many documents were classified locally versus by the LLM
+        """
+        total = self.local_hits + self.llm_calls
+        return {
+            **self.local_classifier.stats(),
+            "local": self.local_hits,
+            "llm": self.llm_calls,
+            "local_rate": round(self.local_hits / total, 4) if total else 0.0
         }
         
     def get_tool(self):
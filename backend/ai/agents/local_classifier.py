@@ -0,0 +1,185 @@
+# backend/ai/agents/local_classifier.py
+"""
+CPU-only document classifier that answers before GPT-4 is asked.
+
+Two signals are combined: keyword rules for the layouts we see every day
+(CBCs, metabolic panels, prescriptions, imaging reports) and a TF-IDF
+nearest-centroid model trained on the document types of past documents.
+Only documents neither signal is confident about go to the LLM.
+"""
+from collections import Counter
+import math
+import os
+import re
+import threading
+
+from ..lexical_index import tokenize
+
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.8"))
+# Labels need at least this many examples before the centroid model predicts them
+LOCAL_CLASSIFIER_MIN_EXAMPLES = int(os.getenv("LOCAL_CLASSIFIER_MIN_EXAMPLES", "5"))
+
+# Each pattern that matches counts as one piece of evidence for the label
+KEYWORD_RULES = {
+    "blood_test": [
+        r"\bcbc\b", r"complete blood count", r"metabolic panel", r"\bbmp\b|\bcmp\b",
+        r"hemoglobin|haemoglobin", r"hematocrit", r"platelets?", r"\bwbc\b|white blood cell",
+        r"creatinine", r"glucose", r"reference (range|interval)", r"specimen|collected",
+        r"\b(mg/dl|mmol/l|g/dl|10\^3/ul|u/l)\b"
+    ],
+    "prescription": [
+        r"\brx\b", r"\bsig\b", r"refills?", r"dispense|\bdisp\b", r"\b\d+\s?(mg|mcg)\b",
+        r"\b(tablet|capsule)s?\b", r"\b(once|twice|three times) (a )?daily\b|\b(bid|tid|qd|qhs|prn)\b",
+        r"prescrib(er|ed|ing)", r"\bdea\b|\bnpi\b", r"pharmacy"
+    ],
+    "radiology": [
+        r"radiolog", r"\bimpression\b", r"\bfindings\b", r"\btechnique\b", r"\bcomparison\b",
+        r"x-ray|radiograph", r"\bmri\b", r"\bct\b|computed tomography", r"ultrasound|sonograph",
+        r"contrast", r"\b(pa|lateral|axial|coronal|sagittal)\b( views?)?"
+    ]
+}
+
+_compiled_rules = {
+    label: [re.compile(pattern) for pattern in patterns]
+    for label, patterns in KEYWORD_RULES.items()
+}
+
+# Display names matching the LLM classifier's categories
+DISPLAY_NAMES = {
+    "blood_test": "Blood Test Report",
+    "prescription": "Prescription",
+    "radiology": "Radiology Report"
+}
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    return {term: value / norm for term, value in vector.items()} if norm else vector
+
+
+class LocalDocumentClassifier:
+    """Keyword rules plus a TF-IDF nearest-centroid model"""
+
+    def __init__(self, threshold=LOCAL_CLASSIFIER_THRESHOLD):
+        self.threshold = threshold
+        self._idf = {}
+        self._centroids = {}
+        self._lock = threading.Lock()
+        self.trained_on = 0
+
+    def _tfidf(self, text, idf):
+        counts = Counter(term for term in tokenize(text) if term in idf)
+        return _normalize({term: (1 + math.log(count)) * idf[term] for term, count in counts.items()})
+
+    def train(self, examples):
+        """
+        Fit the centroid model on labelled past documents
+
+        Args:
+            examples (list): (text, document_type) pairs
+        """
+        examples = [(text, label) for text, label in examples if text and label]
+        by_label = Counter(label for _, label in examples)
+        examples = [(text, label) for text, label in examples if by_label[label] >= LOCAL_CLASSIFIER_MIN_EXAMPLES]
+
+        doc_freq = Counter()
+        for text, _ in examples:
+            doc_freq.update(set(tokenize(text)))
+        n_docs = len(examples)
+        # Terms in a single document are noise for a centroid
+        idf = {
+            term: math.log((1 + n_docs) / (1 + df)) + 1
+            for term, df in doc_freq.items() if df > 1
+        }
+
+        sums = {}
+        for text, label in examples:
+            total = sums.setdefault(label, Counter())
+            total.update(self._tfidf(text, idf))
+        centroids = {label: _normalize(dict(total)) for label, total in sums.items()}
+
+        with self._lock:
+            self._idf = idf
+            self._centroids = centroids
+            self.trained_on = n_docs
+
+    def _rule_scores(self, text):
+        lowered = text.lower()
+        return {
+            label: sum(1 for pattern in patterns if pattern.search(lowered))
+            for label, patterns in _compiled_rules.items()
+        }
+
+    def _centroid_scores(self, text):
+        with self._lock:
+            idf, centroids = self._idf, self._centroids
+        if not centroids:
+            return {}
+        vector = self._tfidf(text, idf)
+        return {
+            label: sum(weight * centroid.get(term, 0.0) for term, weight in vector.items())
+            for label, centroid in centroids.items()
+        }
+
+    def classify(self, text):
+        """
+        Classify a document locally
+
+        Args:
+            text (str): The start of the document
+
+        Returns:
+            dict: document_type, confidence in [0, 1] and the evidence used
+        """
+        rules = self._rule_scores(text)
+        ranked_rules = sorted(rules.items(), key=lambda item: item[1], reverse=True)
+        rule_label, rule_hits = ranked_rules[0]
+        runner_up_hits = ranked_rules[1][1] if len(ranked_rules) > 1 else 0
+        # Grows with the evidence and with the margin over the next label
+        rule_confidence = (rule_hits - runner_up_hits) / (rule_hits + 1) if rule_hits else 0.0
+
+        centroid_label, centroid_confidence = None, 0.0
+        similarities = self._centroid_scores(text)
+        if similarities:
+            # Softmax over cosine similarities; 0.05 makes a clear winner dominate
+            top = max(similarities.values())
+            weights = {label: math.exp((sim - top) / 0.05) for label, sim in similarities.items()}
+            centroid_label = max(weights, key=weights.get)
+            # Rescale so a uniform (uninformative) distribution scores 0
+            chance = 1 / len(weights)
+            top_probability = weights[centroid_label] / sum(weights.values())
+            centroid_confidence = (top_probability - chance) / (1 - chance) if len(weights) > 1 else 0.0
+
+        if centroid_label is None or (rule_confidence and rule_label == centroid_label):
+            label = rule_label
+            # Independent agreeing signals
+            confidence = 1 - (1 - rule_confidence) * (1 - centroid_confidence)
+        elif rule_confidence >= centroid_confidence:
+            label, confidence = rule_label, rule_confidence * (1 - centroid_confidence)
+        else:
+            label, confidence = centroid_label, centroid_confidence * (1 - rule_confidence)
+
+        return {
+            "document_type": label,
+            "confidence": round(confidence, 4),
+            "rule_hits": rules,
+            "centroid_similarity": {label: round(sim, 4) for label, sim in similarities.items()}
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "trained_on": self.trained_on,
+                "labels": sorted(self._centroids)
+            }
+
+
+_local_classifier = LocalDocumentClassifier()
+
+
+def get_local_classifier():
+    """
+    Return the process-wide local classifier
+    """
+    return _local_classifier
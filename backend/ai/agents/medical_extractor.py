@@ -2,7 +2,9 @@
 from langchain.tools import Tool
 from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
+from ..llm import get_llm
+from ..llm_cache import get_llm_cache
+from ..windowing import split_windows, map_windows, merge_extractions
 import json
 import re
 
@@ -10,7 +12,7 @@ class MedicalDataExtractor:
     """Tool for extracting structured data from medical documents"""
     
     def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4", temperature=0)
+        self.llm = get_llm(model="gpt-4", temperature=0)
         
         self.extraction_prompts = {
             "blood_test": PromptTemplate(
@@ -95,27 +97,53 @@ class MedicalDataExtractor:
                 """
             )
         }
+        
+        # Chains are built once and reused for every document
+        self.extraction_chains = {
+            name: LLMChain(llm=self.llm, prompt=prompt)
+            for name, prompt in self.extraction_prompts.items()
+        }
     
-    def extract_medical_data(self, document_text, document_type="default"):
+    def extract_medical_data(self, document_text, document_type="default", use_cache=True):
         """
         Extract structured medical data from document text
         
+        Long documents are split into prompt-sized windows that are extracted
+        concurrently and merged into one result, so nothing past the first
+        page is dropped.
+        
         Args:
             document_text (str): The text content of the document
             document_type (str): Type of document (blood_test, radiology, prescription, etc.)
+            use_cache (bool): Set to False to bypass the LLM response cache
             
         Returns:
             dict: Structured medical data extracted from the document
         """
+        windows = split_windows(document_text)
+        parts = map_windows(
+            lambda window: self._extract_window(window, document_type, use_cache),
+            windows
+        )
+        if len(parts) == 1:
+            return parts[0]
+        
+        extracted = [part for part in parts if "error" not in part]
+        if not extracted:
+            return {
+                "error": "Failed to parse structured data",
+                "raw_extraction": "\n\n".join(part["raw_extraction"] for part in parts)
+            }
+        return merge_extractions(extracted)
+    
+    def _extract_window(self, window_text, document_type, use_cache):
         # Select the appropriate prompt template
-        if document_type.lower() in self.extraction_prompts:
-            prompt = self.extraction_prompts[document_type.lower()]
-            chain = LLMChain(llm=self.llm, prompt=prompt)
-            result = chain.run(document_text=document_text[:4000])  # Limit to first 4000 chars
-        else:
-            prompt = self.extraction_prompts["default"]
-            chain = LLMChain(llm=self.llm, prompt=prompt)
-            result = chain.run(document_text=document_text[:4000], document_type=document_type)
+        chain = self.extraction_chains.get(document_type.lower(), self.extraction_chains["default"])
+        inputs = {"document_text": window_text}
+        if "document_type" in chain.prompt.input_variables:
+            # The general template names the kind of document it's reading
+            inputs["document_type"] = "medical document" if document_type.lower() == "default" else document_type
+        result = get_llm_cache().run("extractor", chain, use_cache=use_cache, **inputs)
         
         # Attempt to parse the result as JSON
         try:
@@ -0,0 +1,149 @@
+# backend/ai/agents/phi_detector.py
+"""
+Deterministic PHI scanner for the compliance stage.
+
+All identifier patterns are compiled into one alternation with a named
+group per type, so a document of any length is scanned in a single
+left-to-right pass. Findings carry character offsets and are grouped into
+the categories of HIPAA_COMPLIANCE_CHECK_PROMPT: direct identifiers
+(names, MRN, DOB, ...) and indirect identifiers (dates finer than a year).
+
+Each finding is either certain (a labelled MRN, a formatted SSN) or
+ambiguous (a capitalised word pair that looks like a name, a bare nine
+digit number). Only ambiguous findings need a human or LLM to look at them.
+"""
+import re
+
+# A capitalised name word, including O'Brien and McDonald but not all-caps labels like MRN
+_NAME_WORD = r"[A-Z](?:'[A-Z])?[a-z][a-zA-Z'-]*"
+_MONTHS = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+
+# Common given names; a capitalised word after one of these is likely a surname
+COMMON_FIRST_NAMES = (
+    "James", "John", "Robert", "Michael", "William", "David", "Richard", "Joseph", "Thomas", "Charles",
+    "Christopher", "Daniel", "Matthew", "Anthony", "Mark", "Donald", "Steven", "Paul", "Andrew", "Joshua",
+    "Kenneth", "Kevin", "Brian", "George", "Timothy", "Ronald", "Edward", "Jason", "Jeffrey", "Ryan",
+    "Jacob", "Gary", "Nicholas", "Eric", "Jonathan", "Stephen", "Larry", "Justin", "Scott", "Brandon",
+    "Mary", "Patricia", "Jennifer", "Linda", "Elizabeth", "Barbara", "Susan", "Jessica", "Sarah", "Karen",
+    "Lisa", "Nancy", "Betty", "Margaret", "Sandra", "Ashley", "Kimberly", "Emily", "Donna", "Michelle",
+    "Carol", "Amanda", "Dorothy", "Melissa", "Deborah", "Stephanie", "Rebecca", "Sharon", "Laura", "Cynthia",
+    "Maria", "Jose", "Juan", "Carlos", "Luis", "Ana", "Priya", "Raj", "Wei", "Mohammed", "Fatima", "Ahmed",
+    "Olga", "Ivan", "Yuki", "Hiroshi", "Chen", "Anil", "Sunita", "Grace", "Emma", "Olivia", "Sophia", "Noah"
+)
+
+# (type, category, ambiguous, pattern); order matters where patterns overlap
+_PHI_PATTERNS = [
+    ("ssn", "direct", False, r"\b\d{3}-\d{2}-\d{4}\b"),
+    ("mrn", "direct", False,
+     r"(?i:\b(?:mrn|medical\s+record\s+(?:number|no\.?|#))\s*[:#]?\s*)[A-Z0-9-]{4,}\b"),
+    ("dob", "direct", False,
+     r"(?i:\b(?:dob|d\.o\.b\.|date\s+of\s+birth|birth\s*date)\s*[:#]?\s*)"
+     r"(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2}|(?i:" + _MONTHS + r")\s+\d{1,2},?\s+\d{4})"),
+    ("email", "direct", False, r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b"),
+    ("phone", "direct", False,
+     r"(?<!\d)(?:\+?1[\s.-]?)?(?:\(\d{3}\)\s?|\d{3}[\s.-])\d{3}[\s.-]\d{4}(?!\d)"),
+    ("address", "direct", False,
+     r"\b\d{1,6}\s+(?:[A-Z][a-z]+\s+){1,3}"
+     r"(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct|Way|Place|Pl)\b\.?"),
+    ("zip", "direct", False, r"\b[A-Z]{2}\s+\d{5}(?:-\d{4})?\b"),
+    ("patient_name", "direct", False,
+     # Not "Test Name:" - the label must not follow another word on the same line
+     r"(?<!\w )(?i:\b(?:patient(?:\s+name)?|name|pt)\s*:\s*)" + _NAME_WORD + r"(?:,? " + _NAME_WORD + r"){1,2}"),
+    ("date", "indirect", False,
+     r"\b(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2}|(?i:" + _MONTHS + r")\s+\d{1,2},?\s+\d{4})\b"),
+    ("possible_name", "direct", True,
+     r"\b(?:" + "|".join(COMMON_FIRST_NAMES) + r")\s+[A-Z][a-z]{2,}\b"),
+    ("possible_id", "direct", True, r"(?<!\d)(?<!\d\.)\d{9,10}(?!\d|\.\d)")
+]
+
+PHI_PATTERN = re.compile("|".join(
+    f"(?P<{phi_type}>{pattern})" for phi_type, _, _, pattern in _PHI_PATTERNS
+))
+
+_PHI_TYPES = {phi_type: (category, ambiguous) for phi_type, category, ambiguous, _ in _PHI_PATTERNS}
+
+# Identifiers that are never needed in a clinical document
+_UNNECESSARY_TYPES = ("ssn",)
+
+
+def detect_phi(text):
+    """
+    Find PHI in text in a single pass
+
+    Args:
+        text (str): Document text of any length
+
+    Returns:
+        list: Findings with type, category, start/end offsets and whether they're ambiguous
+    """
+    findings = []
+    for match in PHI_PATTERN.finditer(text):
+        phi_type = match.lastgroup
+        category, ambiguous = _PHI_TYPES[phi_type]
+        findings.append({
+            "type": phi_type,
+            "category": category,
+            "start": match.start(),
+            "end": match.end(),
+            "ambiguous": ambiguous
+        })
+    return findings
+
+
+def assess_phi(findings):
+    """
+    Summarize findings in the shape HIPAA_COMPLIANCE_CHECK_PROMPT asks for
+
+    Args:
+        findings (list): Output of detect_phi
+
+    Returns:
+        dict: phi_present, compliance_status, risk_level, recommended_actions and counts per type
+    """
+    certain = [finding for finding in findings if not finding["ambiguous"]]
+    counts = {}
+    for finding in findings:
+        counts[finding["type"]] = counts.get(finding["type"], 0) + 1
+
+    direct_types = {finding["type"] for finding in certain if finding["category"] == "direct"}
+    if any(phi_type in counts for phi_type in _UNNECESSARY_TYPES):
+        status, risk = "non_compliant", "high"
+    elif direct_types:
+        status, risk = "partially_compliant", "high" if len(direct_types) >= 3 else "medium"
+    elif certain:
+        status, risk = "partially_compliant", "low"
+    else:
+        status, risk = "compliant", "low"
+
+    return {
+        "phi_present": bool(certain),
+        "compliance_status": status,
+        "risk_level": risk,
+        "recommended_actions": [f"redact_{phi_type}" for phi_type in sorted(counts) if not _PHI_TYPES[phi_type][1]],
+        "counts": counts
+    }
+
+
+def ambiguous_excerpts(text, findings, context_chars=200):
+    """
+    Cut the text around ambiguous findings, merging excerpts that overlap
+
+    Args:
+        text (str): The scanned text
+        findings (list): Output of detect_phi
+        context_chars (int): Characters kept on each side of a finding
+
+    Returns:
+        list: Excerpt strings in document order
+    """
+    ranges = []
+    for finding in findings:
+        if not finding["ambiguous"]:
+            continue
+        start = max(0, finding["start"] - context_chars)
+        end = min(len(text), finding["end"] + context_chars)
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+    return [text[start:end] for start, end in ranges]
@@ -0,0 +1,81 @@
+# backend/ai/checkpoints.py
+"""
+Per-stage results of the document pipeline, stored as sidecar files.
+
+Each stage's output is keyed by the document's content hash and the
+stage's version, a fingerprint of everything that shapes the result
+(code version, prompts, model, upstream stage versions). A retry finds
+the stages that already succeeded and only runs the rest; bumping one
+prompt invalidates that stage and the stages built on it, nothing else.
+
+Files live under CHECKPOINT_DIR/<hash[:2]>/<hash>/<stage>.<version>.<ext>.
+Files from older versions are left in place and never read again.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "./storage/checkpoints")
+CHECKPOINTS_DISABLED = os.getenv("CHECKPOINTS_DISABLED", "").lower() in ("1", "true", "yes")
+
+
+def fingerprint(*parts):
+    """Short stable hash of JSON-serialisable parts, used as a stage version"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+class CheckpointStore:
+    """Stage results for one document's content"""
+
+    def __init__(self, content_hash, root=CHECKPOINT_DIR):
+        self.content_hash = content_hash
+        self.directory = os.path.join(root, content_hash[:2], content_hash)
+
+    def path(self, stage, version, extension="json"):
+        """Where a stage's result for this version lives"""
+        return os.path.join(self.directory, f"{stage}.{version}.{extension}")
+
+    def load(self, stage, version):
+        """
+        Return a stage's stored result
+
+        Returns:
+            The result, or None if it's missing, from another version or unreadable
+        """
+        try:
+            with open(self.path(stage, version), "r") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("stage") != stage or record.get("version") != version or "result" not in record:
+            return None
+        return record["result"]
+
+    def save(self, stage, version, result):
+        """Store a stage's result; readers never see a partly written file"""
+        record = {"stage": stage, "version": version, "saved_at": time.time(), "result": result}
+        self.write_atomic(self.path(stage, version), json.dumps(record, default=str))
+
+    def has_file(self, stage, version, extension):
+        return os.path.exists(self.path(stage, version, extension))
+
+    def write_atomic(self, path, content):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+def get_checkpoints(content_hash):
+    """
+    Return the checkpoint store for a document's content
+
+    Returns:
+        CheckpointStore: Or None if checkpoints are disabled or the hash is unknown
+    """
+    if CHECKPOINTS_DISABLED or not content_hash:
+        return None
+    return CheckpointStore(content_hash)
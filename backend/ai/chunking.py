@@ -0,0 +1,92 @@
+# backend/ai/chunking.py
+"""
+Incremental text reading and chunking for documents of any size.
+
+Text flows through generators so only a bounded window of a document is
+held in memory at once, regardless of the document's length.
+"""
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from itertools import islice
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# How much text to accumulate before splitting, in multiples of CHUNK_SIZE
+_WINDOW_CHUNKS = 16
+
+
+def iter_file_text(file_path, block_size=64 * 1024):
+    """
+    Read a text file incrementally
+
+    Args:
+        file_path (str): Path to the file
+        block_size (int): Characters per block
+
+    Yields:
+        str: Consecutive blocks of the file's text
+    """
+    with open(file_path, "r") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield block
+
+
+def iter_chunks(text_blocks, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """
+    Split a stream of text into overlapping chunks
+
+    Produces the same kind of chunks as RecursiveCharacterTextSplitter over
+    the whole text, but splits a rolling window instead. The last chunk of
+    each window is carried into the next one, so chunks keep overlapping
+    across window boundaries.
+
+    Args:
+        text_blocks (iterable): Blocks of text in document order
+        chunk_size (int): Maximum chunk size in characters
+        chunk_overlap (int): Overlap between neighbouring chunks
+
+    Yields:
+        str: Chunks in document order
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    window_size = chunk_size * _WINDOW_CHUNKS
+    buffer = ""
+
+    for block in text_blocks:
+        buffer += block
+        if len(buffer) < window_size:
+            continue
+
+        chunks = text_splitter.split_text(buffer)
+        if len(chunks) < 2:
+            continue
+        yield from chunks[:-1]
+
+        # Keep the tail from where the last chunk starts, including its
+        # trailing whitespace, so the next window continues seamlessly
+        start = buffer.rfind(chunks[-1])
+        buffer = buffer[start:] if start >= 0 else chunks[-1] + "\n"
+
+    if buffer.strip():
+        yield from text_splitter.split_text(buffer)
+
+
+def batched(iterable, size):
+    """
+    Group an iterable into lists of at most size items
+
+    Yields:
+        list: The next batch
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            break
+        yield batch
@@ -1,96 +1,149 @@
 # backend/ai/crew.py
-from crewai import Agent, Task, Crew, Process
-from langchain.chat_models import ChatOpenAI
+from crewai import Agent, Task, Crew
+import os
+import threading
+from .llm import get_llm
 from .agents.document_processor import DocumentClassifier
 from .agents.medical_extractor import MedicalDataExtractor
 from .agents.compliance_agent import ComplianceAgent
 from .agents.doctor_assistant import DoctorAssistant
+from .agents.phi_detector import PHI_PATTERN
+from .task_graph import TaskGraph
+from .checkpoints import fingerprint
+from .executor import run_ai
+from .windowing import AGENT_WINDOW_TOKENS, AGENT_WINDOW_OVERLAP_TOKENS, AGENT_MAX_DOCUMENT_TOKENS
+
+# Bump a task's number when its code changes how results are produced;
+# prompt and model changes are picked up by task_versions on their own
+TASK_CODE_VERSIONS = {"classification": 1, "extraction": 1, "compliance": 2}
 
 class MedicalDocumentCrew:
-    def __init__(self, openai_api_key):
-        # Initialize the LLM
-        self.llm = ChatOpenAI(
-            model="gpt-4",
-            temperature=0,
-            api_key=openai_api_key
-        )
-        
-        # Create the agents
-        self.classifier_agent = Agent(
-            role="Medical Document Classifier",
-            goal="Accurately classify medical documents by type",
-            backstory="You are an expert in medical document classification with years of experience in healthcare records management.",
-            verbose=True,
-            allow_delegation=True,
-            llm=self.llm,
-            tools=[DocumentClassifier().classify_document]
-        )
-        
-        self.extractor_agent = Agent(
-            role="Medical Data Extractor",
-            goal="Extract key medical data from documents with high precision",
-            backstory="You are a specialized medical data extraction system trained to identify and extract critical health information from various medical reports.",
-            verbose=True,
-            allow_delegation=True,
-            llm=self.llm,
-            tools=[MedicalDataExtractor().extract_medical_data]
-        )
-        
-        self.compliance_agent = Agent(
-            role="Healthcare Compliance Officer",
-            goal="Ensure all documents and extractions meet HIPAA compliance standards",
-            backstory="You are a compliance expert responsible for ensuring all medical data handling follows strict privacy regulations.",
-            verbose=True,
-            allow_delegation=False,
-            llm=self.llm,
-            tools=[ComplianceAgent().check_compliance]
-        )
+    """
+    Document pipeline over the classifier, extractor and compliance tools
+
+    The tools are called directly from a task graph rather than through
+    CrewAI agents, so independent tasks can run at the same time; each tool
+    brings its own shared LLM client.
+    """
+
+    def __init__(self):
+        # Tool instances are built once and shared by every document
+        self.classifier = DocumentClassifier()
+        self.extractor = MedicalDataExtractor()
+        self.compliance_checker = ComplianceAgent()
     
-    def process_document(self, document_text, filename):
+    def build_task_graph(self, document_text):
         """
-        Process a medical document through the agent crew
+        Describe the document pipeline as a dependency graph
+
+        Compliance only needs the raw text, and extraction starts with the
+        general template while classification runs. Once the type is known,
+        extraction is redone with a specialised template only if one exists.
+
+        Args:
+            document_text (str): The text content of the document
+
+        Returns:
+            TaskGraph: Graph producing classification, extraction and compliance
         """
-        # Define tasks
-        classification_task = Task(
-            description=f"Classify the following medical document: {filename}. Determine whether it's a blood report, radiology report, prescription, or other medical document type.",
-            agent=self.classifier_agent,
-            expected_output="Document type classification with confidence score"
-        )
-        
-        extraction_task = Task(
-            description="Extract all relevant medical data including patient information, test results, diagnoses, and key health indicators.",
-            agent=self.extractor_agent,
-            expected_output="Structured JSON containing all extracted medical data",
-            context=[classification_task]
-        )
-        
-        compliance_task = Task(
-            description="Verify the extracted data complies with HIPAA standards. Flag any potential compliance issues.",
-            agent=self.compliance_agent,
-            expected_output="Compliance verification report",
-            context=[extraction_task]
+        def refine_extraction(results):
+            template = _extraction_template(results["classification"])
+            if template == "default":
+                return results["extraction_default"]
+            return self.extractor.extract_medical_data(document_text, document_type=template)
+
+        graph = TaskGraph()
+        graph.add("classification", lambda _: self.classifier.classify_document(document_text))
+        graph.add("compliance", lambda _: self.compliance_checker.check_compliance(document_text))
+        graph.add("extraction_default", lambda _: self.extractor.extract_medical_data(document_text))
+        graph.add("extraction", refine_extraction, depends_on=("classification", "extraction_default"))
+        return graph
+
+    def task_versions(self):
+        """
+        Version each task's results by its code, prompts, model and windowing
+
+        Returns:
+            dict: Task name -> version string; a change means stored results are stale
+        """
+        windowing = (AGENT_WINDOW_TOKENS, AGENT_WINDOW_OVERLAP_TOKENS, AGENT_MAX_DOCUMENT_TOKENS)
+        classification = fingerprint(
+            TASK_CODE_VERSIONS["classification"], windowing,
+            self.classifier.classification_prompt.template, self.classifier.llm.model_name
         )
-        
-        # Create and run the crew
-        crew = Crew(
-            agents=[self.classifier_agent, self.extractor_agent, self.compliance_agent],
-            tasks=[classification_task, extraction_task, compliance_task],
-            verbose=True,
-            process=Process.sequential
+        return {
+            "classification": classification,
+            # The template used depends on the classification
+            "extraction": fingerprint(
+                TASK_CODE_VERSIONS["extraction"], windowing, classification,
+                {name: prompt.template for name, prompt in self.extractor.extraction_prompts.items()},
+                self.extractor.llm.model_name
+            ),
+            "compliance": fingerprint(
+                TASK_CODE_VERSIONS["compliance"], windowing, PHI_PATTERN.pattern,
+                self.compliance_checker.compliance_prompt.template, self.compliance_checker.llm.model_name
+            )
+        }
+
+    def process_document(self, document_text, filename, graph=None, precomputed=None, on_task_done=None):
+        """
+        Process a medical document through the agent tools
+
+        Independent tasks run concurrently; see build_task_graph. CrewAI's
+        processes only run tasks one after another, so the graph calls the
+        agents' tools directly.
+
+        Args:
+            document_text (str): The text content of the document
+            filename (str): Original file name
+            graph (TaskGraph, optional): Custom graph, defaults to build_task_graph
+            precomputed (dict, optional): Task results that are already known
+            on_task_done (callable, optional): Called with each task's name and result as it finishes
+
+        Returns:
+            dict: classification, extraction and compliance results plus timings
+        """
+        graph = graph or self.build_task_graph(document_text)
+        results, timings = graph.run(precomputed=precomputed, on_task_done=on_task_done)
+
+        classification = dict(results.get("classification", {}))
+        template = _extraction_template(classification)
+        classification.setdefault("document_type", "other" if template == "default" else template)
+        return {
+            "classification": classification,
+            "extraction": results.get("extraction", {}),
+            "compliance": results.get("compliance", {}),
+            "timings": timings
+        }
+
+    async def aprocess_document(self, document_text, filename, graph=None, precomputed=None, on_task_done=None):
+        """
+        Async variant of process_document that runs on the bounded AI pool
+        """
+        return await run_ai(
+            self.process_document, document_text, filename,
+            graph=graph, precomputed=precomputed, on_task_done=on_task_done
         )
-        
-        result = crew.kickoff(inputs={"document_text": document_text})
-        return result
+
+
+def _extraction_template(classification):
+    """Map a classifier answer onto one of the extractor's templates"""
+    if classification.get("document_type") in ("blood_test", "radiology", "prescription"):
+        return classification["document_type"]
+    text = classification.get("result", "").lower()
+    for keyword, template in (("blood", "blood_test"), ("radiology", "radiology"), ("prescription", "prescription")):
+        if keyword in text:
+            return template
+    return "default"
 
 
 class DoctorAssistantCrew:
     def __init__(self, openai_api_key):
         # Initialize the LLM
-        self.llm = ChatOpenAI(
-            model="gpt-4",
-            temperature=0.2,
-            api_key=openai_api_key
-        )
+        self.llm = get_llm(model="gpt-4", temperature=0.2, api_key=openai_api_key)
+        
+        # One tool instance backs both of the agent's tools
+        self.assistant_tools = DoctorAssistant()
         
         # Create the agent
         self.doctor_assistant = Agent(
@@ -100,7 +153,7 @@ class DoctorAssistantCrew:
             verbose=True,
             allow_delegation=False,
             llm=self.llm,
-            tools=[DoctorAssistant().retrieve_patient_records, DoctorAssistant().analyze_medical_trends]
+            tools=[self.assistant_tools.retrieve_patient_records, self.assistant_tools.analyze_medical_trends]
         )
     
     def answer_query(self, query, patient_id, doctor_id):
@@ -121,4 +174,56 @@ class DoctorAssistantCrew:
         )
         
         result = crew.kickoff()
-        return result
\ No newline at end of file
+        return result
+
+    async def aanswer_query(self, query, patient_id, doctor_id):
+        """
+        Async variant of answer_query that runs on the bounded AI pool
+        """
+        return await run_ai(self.answer_query, query, patient_id, doctor_id)
+
+    def stream_answer(self, query, context):
+        """
+        Stream an answer grounded in already-retrieved patient context
+
+        Skips the agent's tool-use loop so the first tokens arrive as soon
+        as the model starts generating.
+
+        Args:
+            query (str): The doctor's question
+            context (str): Relevant excerpts from the patient's records
+
+        Returns:
+            async generator: Pieces of the answer in order
+        """
+        return self.assistant_tools.stream_medical_answer(query, context)
+
+
+_document_crew = None
+_assistant_crew = None
+_crews_lock = threading.Lock()
+
+
+def get_document_crew():
+    """
+    Return the process-wide MedicalDocumentCrew, building it on first use
+
+    Tools and LLM clients are long-lived; only the task graph for each
+    document is created per request.
+    """
+    global _document_crew
+    with _crews_lock:
+        if _document_crew is None:
+            _document_crew = MedicalDocumentCrew()
+        return _document_crew
+
+
+def get_assistant_crew():
+    """
+    Return the process-wide DoctorAssistantCrew, building it on first use
+    """
+    global _assistant_crew
+    with _crews_lock:
+        if _assistant_crew is None:
+            _assistant_crew = DoctorAssistantCrew(os.getenv("OPENAI_API_KEY"))
+        return _assistant_crew
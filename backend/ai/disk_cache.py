@@ -0,0 +1,160 @@
+# backend/ai/disk_cache.py
+"""
+Small SQLite-backed key/value store with LRU eviction under a byte budget
+and optional expiry.
+
+Used for caches that must survive restarts (embeddings, model responses)
+without running an extra service.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """Persistent LRU cache of binary values keyed by string"""
+
+    def __init__(self, path, max_bytes, ttl_seconds=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL, expires_at REAL)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(entries)")]
+        if "expires_at" not in columns:
+            # Cache files created before expiry support
+            self._conn.execute("ALTER TABLE entries ADD COLUMN expires_at REAL")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)"
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+
+    def get(self, key):
+        """
+        Look up a single value
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            bytes: The cached value, or None on a miss
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """
+        Look up several values at once and mark them as recently used
+
+        Args:
+            keys (list): Cache keys
+
+        Returns:
+            dict: Mapping of key to value for every key that was found
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        expired = []
+        now = time.time()
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value, size, expires_at FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, value, size, expires_at in rows:
+                    if expires_at is not None and expires_at <= now:
+                        expired.append((key, size))
+                    else:
+                        found[key] = value
+            if expired:
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in expired])
+                self._total_bytes -= sum(size for _, size in expired)
+                self.expirations += len(expired)
+            if found:
+                self._conn.executemany(
+                    "UPDATE entries SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+            if found or expired:
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, items):
+        """
+        Store several values, evicting least recently used entries if over budget
+
+        Args:
+            items (dict): Mapping of key to bytes value
+        """
+        if not items:
+            return
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            for key, value in items.items():
+                row = self._conn.execute(
+                    "SELECT size FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    self._total_bytes -= row[0]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, last_access, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, expires_at)
+                )
+                self._total_bytes += len(value)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        cursor = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access")
+        stale = []
+        for key, size in cursor:
+            if self._total_bytes <= self.max_bytes:
+                break
+            stale.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    def stats(self):
+        """
+        Report cache effectiveness and size
+
+        Returns:
+            dict: Hit/miss counters, hit rate and current size in bytes
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
@@ -0,0 +1,120 @@
+# backend/ai/embedding_batcher.py
+from langchain.embeddings.base import Embeddings
+from concurrent.futures import Future
+import queue
+import threading
+import time
+from typing import List
+
+from .metrics import Histogram
+
+
+class _PendingText:
+    __slots__ = ("text", "future", "enqueued_at")
+
+    def __init__(self, text):
+        self.text = text
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings front-end that coalesces texts from concurrent callers into
+    batched forward passes.
+
+    Every text is queued individually; a single worker thread flushes a batch
+    once it reaches max_batch_size or the oldest text has waited max_wait_ms,
+    then resolves each caller's future. Queries and document chunks share the
+    same batches, which is valid for sentence-transformer models where a
+    query embedding is the same as a one-text document embedding.
+    """
+
+    def __init__(self, load_model, max_batch_size=64, max_wait_ms=5):
+        self._load_model = load_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256])
+        self.queue_wait_ms = Histogram([0.5, 1, 2, 5, 10, 20, 50, 100, 250, 1000])
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _next_batch(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Drain anything already queued even past the deadline
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            for item in batch:
+                self.queue_wait_ms.observe((started - item.enqueued_at) * 1000)
+            self.batch_sizes.observe(len(batch))
+
+            try:
+                vectors = self._load_model().embed_documents([item.text for item in batch])
+            except Exception as e:
+                for item in batch:
+                    item.future.set_exception(e)
+                continue
+
+            for item, vector in zip(batch, vectors):
+                item.future.set_result(vector)
+
+    def submit(self, texts):
+        """
+        Queue texts for embedding without waiting for the result
+
+        Args:
+            texts (list): Texts to embed
+
+        Returns:
+            list: One Future per text, resolved with its vector
+        """
+        self._ensure_worker()
+        pending = [_PendingText(text) for text in texts]
+        for item in pending:
+            self._queue.put(item)
+        return [item.future for item in pending]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [future.result() for future in self.submit(texts)]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit([text])[0].result()
+
+    def stats(self):
+        """
+        Report batching behaviour for throughput/latency tuning
+
+        Returns:
+            dict: Batch-size and queue-wait histograms plus current queue depth
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot()
+        }
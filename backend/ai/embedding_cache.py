@@ -0,0 +1,58 @@
+# backend/ai/embedding_cache.py
+from langchain.embeddings.base import Embeddings
+import hashlib
+import numpy as np
+from typing import List
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that checks a content-addressed disk cache before
+    running the model.
+
+    Keys are the model name plus a SHA-256 of the text, so identical chunks
+    from reprocessed or duplicate documents are only embedded once. The
+    model is only loaded when there is at least one miss.
+    """
+
+    def __init__(self, load_model, model_name, cache, dtype="float16"):
+        self._load_model = load_model
+        self.model_name = model_name
+        self.cache = cache
+        self.dtype = np.dtype(dtype)
+
+    def _key(self, kind, text):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{kind}:{digest}"
+
+    def _encode(self, vector):
+        return np.asarray(vector, dtype=self.dtype).tobytes()
+
+    def _decode(self, blob):
+        return np.frombuffer(blob, dtype=self.dtype).astype(np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key("doc", text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once, even if it repeats in the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self._load_model().embed_documents(list(missing.values()))
+            fresh = {key: self._encode(vector) for key, vector in zip(missing, vectors)}
+            self.cache.set_many(fresh)
+            cached.update(fresh)
+
+        return [self._decode(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        blob = self.cache.get(key)
+        if blob is None:
+            blob = self._encode(self._load_model().embed_query(text))
+            self.cache.set(key, blob)
+        return self._decode(blob)
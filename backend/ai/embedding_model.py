@@ -0,0 +1,148 @@
+# backend/ai/embedding_model.py
+"""
+Process-wide provider for the sentence-transformer embedding model.
+
+The model is loaded lazily on first use and shared by every agent and by
+the embeddings module, so it is only read from disk once per process.
+"""
+from langchain.embeddings import HuggingFaceEmbeddings
+import os
+import threading
+import time
+import resource
+
+from .disk_cache import DiskCache
+from .embedding_cache import CachedEmbeddings
+from .embedding_batcher import BatchedEmbeddings
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-mpnet-base-v2")
+
+# On-disk cache of chunk and query vectors
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./storage/cache/embeddings.sqlite")
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+
+# Cross-request micro-batching of cache misses
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+
+_model = None
+_model_lock = threading.Lock()
+_load_stats = {}
+
+_batcher = None
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def _rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_embedding_model():
+    """
+    Return the shared embedding model, loading it on first call
+
+    Returns:
+        HuggingFaceEmbeddings: The process-wide embedding model
+    """
+    global _model
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        # Another thread may have finished loading while we waited
+        if _model is None:
+            rss_before = _rss_mb()
+            started = time.perf_counter()
+            model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+            _load_stats.update({
+                "model_name": EMBEDDING_MODEL_NAME,
+                "load_time_seconds": round(time.perf_counter() - started, 3),
+                "memory_mb": round(_rss_mb() - rss_before, 1),
+                "loaded_at": time.time()
+            })
+            _model = model
+    return _model
+
+
+def set_embedding_model(model):
+    """
+    Replace the shared model, e.g. with a deterministic fake for offline benchmarks
+
+    Must be called before the first call to get_embeddings().
+
+    Args:
+        model: Object with embed_documents and embed_query methods
+    """
+    global _model
+    with _model_lock:
+        _model = model
+        _load_stats.update({"model_name": type(model).__name__, "load_time_seconds": 0.0, "memory_mb": 0.0})
+
+
+def get_embedding_model_stats():
+    """
+    Report how long the model took to load and how much memory it added
+
+    Returns:
+        dict: Load statistics, with loaded=False if the model isn't loaded yet
+    """
+    return {"loaded": _model is not None, **_load_stats}
+
+
+def get_embeddings():
+    """
+    Return the embeddings object used for indexing and search
+
+    Wraps the shared model in a persistent content-addressed cache, so the
+    model is only loaded and run for text it hasn't seen before. Misses from
+    concurrent callers are coalesced into batched forward passes.
+
+    Returns:
+        CachedEmbeddings: The process-wide cached embeddings
+    """
+    global _embeddings, _batcher
+    if _embeddings is not None:
+        return _embeddings
+
+    with _embeddings_lock:
+        if _embeddings is None:
+            cache = DiskCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+            _batcher = BatchedEmbeddings(
+                load_model=get_embedding_model,
+                max_batch_size=EMBEDDING_BATCH_SIZE,
+                max_wait_ms=EMBEDDING_BATCH_WAIT_MS
+            )
+            _embeddings = CachedEmbeddings(
+                load_model=lambda: _batcher,
+                model_name=EMBEDDING_MODEL_NAME,
+                cache=cache,
+                dtype=EMBEDDING_CACHE_DTYPE
+            )
+    return _embeddings
+
+
+def get_embedding_cache_stats():
+    """
+    Report hit/miss counters for the embedding cache
+
+    Returns:
+        dict: Cache statistics, empty if the cache hasn't been opened yet
+    """
+    if _embeddings is None:
+        return {}
+    return _embeddings.cache.stats()
+
+
+def get_embedding_batch_stats():
+    """
+    Report batch-size and queue-wait histograms for the embedding batcher
+
+    Returns:
+        dict: Batcher statistics, empty if no embeddings have been requested yet
+    """
+    if _batcher is None:
+        return {}
+    return _batcher.stats()
@@ -1,141 +1,718 @@
 # backend/ai/embeddings.py
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.document_loaders import TextLoader
+from langchain.docstore.document import Document
+from langchain.docstore.in_memory import InMemoryDocstore
+import faiss
+import fcntl
+import hashlib
+import numpy as np
 import os
 import json
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import List, Dict, Any
 
-# Initialize embeddings model
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
+from .embedding_model import get_embeddings
+from .index_cache import VectorIndexCache
+from .lexical_index import LexicalIndex
+from .chunking import CHUNK_OVERLAP, CHUNK_SIZE, batched, iter_chunks
+from .vector_index import build_index, configure_search, recall_report, target_index_type
 
-def create_document_embeddings(document_id: str, text_content: str, metadata: Dict[str, Any]):
+# Root directory for the per-patient vector indexes
+VECTOR_STORAGE_DIR = os.getenv("VECTOR_STORAGE_DIR", "./storage/vectors")
+
+# Maps document IDs to the patient index that holds their chunks
+_MANIFEST_PATH = os.path.join(VECTOR_STORAGE_DIR, "documents.json")
+
+# Loaded patient indexes kept in memory between searches
+VECTOR_CACHE_MAX_MB = int(os.getenv("VECTOR_CACHE_MAX_MB", "1024"))
+vector_index_cache = VectorIndexCache(VECTOR_CACHE_MAX_MB * 1024 * 1024)
+
+# Runs the lexical half of hybrid searches alongside the vector half
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical-search")
+
+# Reciprocal-rank fusion constant; larger values flatten the rank weighting
+RRF_K = 60
+
+# Chunks embedded and appended per step while ingesting a document
+EMBEDDING_INGEST_BATCH = int(os.getenv("EMBEDDING_INGEST_BATCH", "64"))
+
+# Share of tombstoned chunks in a patient index that triggers a rebuild
+VECTOR_COMPACTION_THRESHOLD = float(os.getenv("VECTOR_COMPACTION_THRESHOLD", "0.2"))
+_compaction_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-compaction")
+
+# One lock per patient so concurrent uploads don't overwrite each other's
+# appends. Queue workers and the API process all write indexes, so each is
+# backed by a lock file as well as a thread lock
+_LOCK_DIR = os.path.join(VECTOR_STORAGE_DIR, "locks")
+_patient_locks = {}
+_patient_locks_guard = threading.Lock()
+_manifest_lock = threading.Lock()
+
+
+@contextmanager
+def _file_lock(path):
+    """Hold an exclusive flock on path, blocking until other processes release it"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+@contextmanager
+def _patient_lock(patient_id):
+    """
+    Hold a patient's index for writing
+
+    Writers must read the index files only after taking this, since another
+    process may have changed them since they were last read.
     """
-    Create and store vector embeddings for a document
-    
+    with _patient_locks_guard:
+        if patient_id not in _patient_locks:
+            _patient_locks[patient_id] = threading.Lock()
+        thread_lock = _patient_locks[patient_id]
+    with thread_lock, _file_lock(os.path.join(_LOCK_DIR, f"{patient_id}.lock")):
+        yield
+
+
+def _patient_index_path(patient_id):
+    return os.path.join(VECTOR_STORAGE_DIR, "patients", str(patient_id))
+
+
+def _load_vectorstore(storage_path, mmap=False):
+    """
+    Load a saved FAISS store written by _save_vectorstore
+
     Args:
-        document_id (str): The document ID
-        text_content (str): The text content of the document
-        metadata (dict): Document metadata
-        
+        storage_path (str): Patient index directory
+        mmap (bool): Memory-map the index file instead of reading it into RAM.
+            Mapped indexes are read-only and only suitable for searching.
+
     Returns:
-        str: Path to the saved vector store
+        FAISS: The loaded vector store
     """
-    # Create a text splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
+    index_file = os.path.join(storage_path, "index.faiss")
+    for attempt in range(5):
+        if attempt:
+            # Give the writer time to finish renaming both files
+            time.sleep(0.01 * attempt)
+        with open(os.path.join(storage_path, "index.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+
+        if mmap:
+            try:
+                index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                # Index types without mmap support are read normally
+                index = faiss.read_index(index_file)
+        else:
+            index = faiss.read_index(index_file)
+
+        # A save can land between the two reads; compaction changes the row
+        # count, so a mismatch means we caught files from different saves
+        if index.ntotal == len(index_to_docstore_id):
+            break
+    else:
+        raise RuntimeError(f"Vector store at {storage_path} changed while loading")
+    configure_search(index)
+
+    return FAISS(
+        embedding_function=get_embeddings(),
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id
     )
-    
-    # Split text into chunks
-    texts = text_splitter.split_text(text_content)
-    
-    # Add metadata to each chunk
-    metadatas = [metadata.copy() for _ in range(len(texts))]
-    for i, meta in enumerate(metadatas):
-        meta["chunk"] = i
-        meta["document_id"] = document_id
-    
-    # Create a vector store
-    vectorstore = FAISS.from_texts(texts=texts, embedding=embeddings, metadatas=metadatas)
-    
-    # Save the vector store
-    storage_path = f"./storage/vectors/{document_id}"
-    os.makedirs(os.path.dirname(storage_path), exist_ok=True)
-    vectorstore.save_local(storage_path)
-    
+
+
+def _load_cached_vectorstore(storage_path):
+    size = sum(
+        os.path.getsize(os.path.join(storage_path, name))
+        for name in ("index.faiss", "index.pkl")
+    )
+    return _load_vectorstore(storage_path, mmap=True), size
+
+
+def _lexical_index_path(storage_path):
+    return os.path.join(storage_path, "lexical")
+
+
+def _load_lexical_index(storage_path):
+    lexical_index = LexicalIndex(_lexical_index_path(storage_path))
+    return lexical_index, lexical_index.size_bytes()
+
+
+def _update_lexical_index(storage_path, vectorstore):
+    """Index every row the lexical index doesn't cover yet, i.e. newly appended chunks"""
+    lexical_index = LexicalIndex(_lexical_index_path(storage_path))
+    row_start = lexical_index.n_rows
+    rows = range(0 if lexical_index.needs_merge() else row_start, vectorstore.index.ntotal)
+    texts = [_chunk_for_row(vectorstore, row).page_content for row in rows]
+
+    if lexical_index.needs_merge():
+        lexical_index.rebuild(texts)
+    elif texts:
+        lexical_index.add(row_start, texts)
+
+
+def _chunk_for_row(vectorstore, row):
+    return vectorstore.docstore.search(vectorstore.index_to_docstore_id[row])
+
+
+def _generation_path(storage_path):
+    # Token rewritten on every change to a patient's index files; API and
+    # worker processes compare it to know when their cached copy is stale
+    return os.path.join(storage_path, "generation.json")
+
+
+def _index_generation(storage_path):
+    return _read_json(_generation_path(storage_path), None)
+
+
+def _invalidate_patient(patient_id):
+    storage_path = _patient_index_path(patient_id)
+    if os.path.isdir(storage_path):
+        # Unique temp name: other processes may be bumping the same patient
+        path = _generation_path(storage_path)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(uuid.uuid4().hex, f)
+        os.replace(tmp_path, path)
+    vector_index_cache.invalidate(patient_id)
+    vector_index_cache.invalidate(f"{patient_id}:lexical")
+    vector_index_cache.invalidate(f"{patient_id}:tombstones")
+
+
+def chunk_id(document_id, chunk_index, text):
+    """
+    Stable ID of a chunk: the same document text always yields the same IDs,
+    so reprocessing only touches chunks whose content actually changed
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return f"{document_id}:{chunk_index}:{digest}"
+
+
+def _read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _chunk_map_path(storage_path):
+    # document_id -> IDs of its live chunks
+    return os.path.join(storage_path, "chunks.json")
+
+
+def _tombstones_path(storage_path):
+    # IDs of chunks that are still in the index but must not be returned
+    return os.path.join(storage_path, "tombstones.json")
+
+
+def _load_tombstones(storage_path):
+    tombstones = set(_read_json(_tombstones_path(storage_path), []))
+    return tombstones, sum(len(chunk) for chunk in tombstones)
+
+
+def _is_indexed(vectorstore, chunk):
+    return vectorstore is not None and isinstance(vectorstore.docstore.search(chunk), Document)
+
+
+def _needs_compaction(chunk_map, tombstones):
+    live = sum(len(chunks) for chunks in chunk_map.values())
+    return bool(tombstones) and len(tombstones) >= VECTOR_COMPACTION_THRESHOLD * (live + len(tombstones))
+
+
+def _save_vectorstore(vectorstore, storage_path):
+    """
+    Save a FAISS store by writing new files and renaming them into place
+
+    Truncating index.faiss in place would break any reader that still has
+    the old file memory-mapped; a rename leaves their mapping intact.
+    _load_vectorstore retries if it reads the two files from different saves.
+    """
+    staging_path = f"{storage_path}.staging"
+    vectorstore.save_local(staging_path)
+    os.makedirs(storage_path, exist_ok=True)
+    for name in ("index.pkl", "index.faiss"):
+        os.replace(os.path.join(staging_path, name), os.path.join(storage_path, name))
+    os.rmdir(staging_path)
+
+
+def _read_index_meta(storage_path):
+    return _read_json(os.path.join(storage_path, "index_meta.json"), {"index_type": "flat"})
+
+
+def _write_index_meta(storage_path, meta):
+    _write_json(os.path.join(storage_path, "index_meta.json"), meta)
+
+
+def _raw_vectors_path(storage_path):
+    return os.path.join(storage_path, "vectors.f32")
+
+
+def _load_raw_vectors(storage_path, dim):
+    """Memory-map the exact float32 vectors kept alongside a patient index"""
+    path = _raw_vectors_path(storage_path)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty((0, dim), dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode="r").reshape(-1, dim)
+
+
+def _append_raw_vectors(storage_path, vectorstore, vectors):
+    """
+    Append exact vectors in index row order
+
+    Quantized indexes can't give back the original vectors, so they are kept
+    on disk for training and recall checks. Rows left over from an append
+    that never reached save are dropped first, and stores created before
+    this file existed are backfilled from their flat index.
+    """
+    index = vectorstore.index
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, index.d)
+    expected_rows = index.ntotal - len(vectors)
+    os.makedirs(storage_path, exist_ok=True)
+    path = _raw_vectors_path(storage_path)
+    row_bytes = index.d * 4
+
+    with open(path, "ab") as f:
+        existing_rows = f.tell() // row_bytes
+        if existing_rows > expected_rows:
+            f.truncate(expected_rows * row_bytes)
+        elif existing_rows < expected_rows:
+            index.reconstruct_n(existing_rows, expected_rows - existing_rows).tofile(f)
+        vectors.tofile(f)
+
+
+def _maybe_retrain_index(vectorstore, storage_path, index_type=None, force=False):
+    """
+    Switch the store to its configured index type once it has enough vectors
+
+    Returns:
+        dict: Index metadata to save with the store
+    """
+    meta = _read_index_meta(storage_path)
+    target = target_index_type(vectorstore.index.ntotal, index_type)
+    if force or target != meta.get("index_type", "flat"):
+        raw_vectors = _load_raw_vectors(storage_path, vectorstore.index.d)
+        vectorstore.index = build_index(raw_vectors, target)
+        meta = {"index_type": target, "trained_on": int(vectorstore.index.ntotal)}
+    return meta
+
+
+def _load_manifest():
+    if not os.path.exists(_MANIFEST_PATH):
+        return {}
+    with open(_MANIFEST_PATH, "r") as f:
+        return json.load(f)
+
+
+def _register_document(document_id, patient_id):
+    with _manifest_lock, _file_lock(os.path.join(_LOCK_DIR, "documents.lock")):
+        # Re-read under the lock so other processes' entries aren't lost
+        manifest = _load_manifest()
+        if patient_id is None:
+            manifest.pop(document_id, None)
+        else:
+            manifest[document_id] = patient_id
+        os.makedirs(VECTOR_STORAGE_DIR, exist_ok=True)
+        tmp_path = f"{_MANIFEST_PATH}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, _MANIFEST_PATH)
+
+
+def create_document_embeddings(document_id: str, text_content, metadata: Dict[str, Any]):
+    """
+    Upsert a document's chunks into its patient's index
+
+    The text is chunked as a stream and embedded in bounded batches that
+    are appended to the index as they are produced, so memory use doesn't
+    grow with the size of the document.
+
+    Chunks get stable content-derived IDs. Chunks that are already indexed
+    are kept, new ones are embedded and appended, and chunks from an
+    earlier version of the document are tombstoned, so reprocessing costs
+    work proportional to what changed in this document.
+
+    Args:
+        document_id (str): The document ID
+        text_content (str or iterable): The document text, or blocks of it
+            in order (e.g. from chunking.iter_file_text)
+        metadata (dict): Document metadata, must include patient_id
+
+    Returns:
+        str: Path to the patient's vector store
+    """
+    patient_id = metadata.get("patient_id")
+    if not patient_id:
+        raise ValueError("Document metadata must include a patient_id")
+
+    text_blocks = [text_content] if isinstance(text_content, str) else text_content
+    chunks = iter_chunks(text_blocks, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    storage_path = _patient_index_path(patient_id)
+
+    with _patient_lock(patient_id):
+        vectorstore = _load_vectorstore(storage_path) if os.path.exists(storage_path) else None
+        chunk_map = _read_json(_chunk_map_path(storage_path), {})
+        tombstones = set(_read_json(_tombstones_path(storage_path), []))
+
+        ids = []
+        appended = False
+        for batch in batched(enumerate(chunks), EMBEDDING_INGEST_BATCH):
+            batch_ids = [chunk_id(document_id, i, text) for i, text in batch]
+            ids.extend(batch_ids)
+
+            # Chunks this document already had are skipped
+            new_rows = [
+                (i, text, chunk) for (i, text), chunk in zip(batch, batch_ids)
+                if not _is_indexed(vectorstore, chunk)
+            ]
+            if not new_rows:
+                continue
+
+            new_texts = [text for _, text, _ in new_rows]
+            new_ids = [chunk for _, _, chunk in new_rows]
+            new_vectors = get_embeddings().embed_documents(new_texts)
+            text_embeddings = list(zip(new_texts, new_vectors))
+
+            # Add metadata to each chunk
+            new_metadatas = []
+            for i, _, chunk in new_rows:
+                meta = metadata.copy()
+                meta["chunk"] = i
+                meta["chunk_id"] = chunk
+                meta["document_id"] = document_id
+                new_metadatas.append(meta)
+
+            # Append to the patient's existing index in place, or start a new one
+            if vectorstore is not None:
+                vectorstore.add_embeddings(text_embeddings, metadatas=new_metadatas, ids=new_ids)
+            else:
+                vectorstore = FAISS.from_embeddings(
+                    text_embeddings, get_embeddings(), metadatas=new_metadatas, ids=new_ids
+                )
+            _append_raw_vectors(storage_path, vectorstore, new_vectors)
+            appended = True
+
+        if vectorstore is None:
+            return storage_path
+
+        # Retire chunks that are no longer part of the document and revive
+        # any that came back
+        tombstones.update(set(chunk_map.get(document_id, [])) - set(ids))
+        tombstones.difference_update(ids)
+
+        if appended:
+            meta = _maybe_retrain_index(vectorstore, storage_path)
+
+            # Save the vector store
+            _save_vectorstore(vectorstore, storage_path)
+            _write_index_meta(storage_path, meta)
+            _update_lexical_index(storage_path, vectorstore)
+
+        chunk_map[document_id] = ids
+        _write_json(_chunk_map_path(storage_path), chunk_map)
+        _write_json(_tombstones_path(storage_path), sorted(tombstones))
+
+        # Searches must not keep serving the indexes we just replaced
+        _invalidate_patient(patient_id)
+        if _needs_compaction(chunk_map, tombstones):
+            _compaction_executor.submit(compact_patient_index, patient_id)
+
+    _register_document(document_id, patient_id)
+
     return storage_path
 
+
+def delete_document_embeddings(document_id, patient_id=None):
+    """
+    Tombstone every chunk of a document so it stops appearing in search
+
+    The chunks are physically removed by the next compaction.
+
+    Args:
+        document_id (str): The document to remove
+        patient_id (str, optional): Owning patient, looked up if not given
+
+    Returns:
+        int: Number of chunks tombstoned
+    """
+    patient_id = _resolve_patient(patient_id, document_id)
+    if not patient_id:
+        return 0
+
+    storage_path = _patient_index_path(patient_id)
+    with _patient_lock(patient_id):
+        chunk_map = _read_json(_chunk_map_path(storage_path), {})
+        removed = chunk_map.pop(document_id, [])
+        if not removed:
+            return 0
+        tombstones = set(_read_json(_tombstones_path(storage_path), []))
+        tombstones.update(removed)
+        _write_json(_chunk_map_path(storage_path), chunk_map)
+        _write_json(_tombstones_path(storage_path), sorted(tombstones))
+        _invalidate_patient(patient_id)
+        if _needs_compaction(chunk_map, tombstones):
+            _compaction_executor.submit(compact_patient_index, patient_id)
+
+    _register_document(document_id, None)
+    return len(removed)
+
+
+def compact_patient_index(patient_id):
+    """
+    Rebuild a patient's index without its tombstoned chunks
+
+    Rewrites the vector index, exact vectors and lexical index in one pass
+    and clears the tombstones. Normally run in the background once
+    tombstones pass VECTOR_COMPACTION_THRESHOLD.
+
+    Args:
+        patient_id (str): Patient whose index should be compacted
+
+    Returns:
+        int: Number of chunks removed
+    """
+    storage_path = _patient_index_path(patient_id)
+    with _patient_lock(patient_id):
+        tombstones = set(_read_json(_tombstones_path(storage_path), []))
+        if not tombstones or not os.path.exists(storage_path):
+            return 0
+
+        vectorstore = _load_vectorstore(storage_path)
+        _append_raw_vectors(storage_path, vectorstore, [])
+        raw_vectors = _load_raw_vectors(storage_path, vectorstore.index.d)
+
+        keep_rows = [
+            row for row in range(vectorstore.index.ntotal)
+            if vectorstore.index_to_docstore_id[row] not in tombstones
+        ]
+        keep_ids = [vectorstore.index_to_docstore_id[row] for row in keep_rows]
+        kept_vectors = np.ascontiguousarray(raw_vectors[keep_rows], dtype=np.float32)
+
+        if keep_rows:
+            index = build_index(kept_vectors, target_index_type(len(keep_rows)))
+        else:
+            index = faiss.IndexFlatL2(vectorstore.index.d)
+        documents = {chunk: vectorstore.docstore.search(chunk) for chunk in keep_ids}
+        compacted = FAISS(
+            embedding_function=get_embeddings(),
+            index=index,
+            docstore=InMemoryDocstore(documents),
+            index_to_docstore_id=dict(enumerate(keep_ids))
+        )
+
+        # Rename the new exact vectors into place like the index files
+        vectors_path = _raw_vectors_path(storage_path)
+        kept_vectors.tofile(f"{vectors_path}.tmp")
+        os.replace(f"{vectors_path}.tmp", vectors_path)
+
+        _save_vectorstore(compacted, storage_path)
+        _write_index_meta(storage_path, {
+            "index_type": target_index_type(len(keep_rows)),
+            "trained_on": len(keep_rows)
+        })
+        LexicalIndex(_lexical_index_path(storage_path)).rebuild(
+            [documents[chunk].page_content for chunk in keep_ids]
+        )
+        _write_json(_tombstones_path(storage_path), [])
+        _invalidate_patient(patient_id)
+
+    return vectorstore.index.ntotal - len(keep_rows)
+
+
+def rebuild_patient_index(patient_id, index_type=None):
+    """
+    Retrain a patient's index as the given type from its stored exact vectors
+
+    Args:
+        patient_id (str): Patient whose index should be rebuilt
+        index_type (str, optional): One of vector_index.INDEX_TYPES, defaults to
+            the configured VECTOR_INDEX_TYPE
+
+    Returns:
+        dict: The saved index metadata
+    """
+    storage_path = _patient_index_path(patient_id)
+    with _patient_lock(patient_id):
+        vectorstore = _load_vectorstore(storage_path)
+        _append_raw_vectors(storage_path, vectorstore, [])
+        meta = _maybe_retrain_index(vectorstore, storage_path, index_type, force=True)
+        _save_vectorstore(vectorstore, storage_path)
+        _write_index_meta(storage_path, meta)
+        _invalidate_patient(patient_id)
+    return meta
+
+
+def patient_index_report(patient_id, k=10, n_queries=200):
+    """
+    Measure recall and latency of each index type on a patient's vectors
+
+    Args:
+        patient_id (str): Patient whose stored vectors are evaluated
+        k (int): Neighbours per query
+        n_queries (int): Number of sampled queries
+
+    Returns:
+        dict: recall_report output, or None if the patient has no index
+    """
+    storage_path = _patient_index_path(patient_id)
+    if not os.path.exists(storage_path):
+        return None
+    index = faiss.read_index(os.path.join(storage_path, "index.faiss"))
+    return recall_report(_load_raw_vectors(storage_path, index.d), k=k, n_queries=n_queries)
+
 def get_vectorstore(patient_id=None, document_id=None):
     """
-    Retrieve a vector store for patient documents or a specific document
-    
+    Retrieve the vector store holding a patient's documents
+
+    Stores are served from an in-memory LRU cache and memory-mapped on a
+    cold load; a store rewritten by another process is reloaded.
+
     Args:
-        patient_id (str, optional): Patient ID to get all their documents
-        document_id (str, optional): Specific document ID
-        
+        patient_id (str, optional): Patient ID whose index should be loaded
+        document_id (str, optional): Document ID, used to find the patient index
+            when no patient ID is given
+
     Returns:
-        FAISS: Vector store for semantic search
+        FAISS: Vector store for semantic search, or None if nothing is indexed
     """
-    if document_id:
-        # Load a specific document vector store
-        storage_path = f"./storage/vectors/{document_id}"
-        if os.path.exists(storage_path):
-            return FAISS.load_local(storage_path, embeddings)
-    
-    elif patient_id:
-        # Find all document vector stores for a patient and merge them
-        # In a real implementation, you would query the database to find all documents
-        # associated with the patient
-        
-        # For demonstration, we'll return a dummy vector store
-        try:
-            combined_docs = []
-            combined_vectors = []
-            
-            # Get all vector stores for the patient
-            document_paths = [f for f in os.listdir("./storage/vectors") if f.startswith(f"patient_{patient_id}_")]
-            
-            if not document_paths:
-                # If no documents found, create a dummy vector store
-                return FAISS.from_texts(
-                    texts=["No patient records found"], 
-                    embedding=embeddings, 
-                    metadatas=[{"patient_id": patient_id}]
-                )
-            
-            # Load and merge vector stores
-            for doc_path in document_paths:
-                vs = FAISS.load_local(f"./storage/vectors/{doc_path}", embeddings)
-                # Merge logic here
-                
-            return FAISS.from_texts(
-                texts=["Sample patient record"], 
-                embedding=embeddings,
-                metadatas=[{"patient_id": patient_id}]
-            )
-        except Exception as e:
-            # If something goes wrong, return an empty vector store
-            return FAISS.from_texts(
-                texts=["Error retrieving patient records"], 
-                embedding=embeddings,
-                metadatas=[{"error": str(e)}]
-            )
-    
-    # Default empty vector store
-    return FAISS.from_texts(
-        texts=["No records found"], 
-        embedding=embeddings,
-        metadatas=[{}]
+    patient_id = _resolve_patient(patient_id, document_id)
+    if not patient_id:
+        return None
+
+    storage_path = _patient_index_path(patient_id)
+    if not os.path.exists(storage_path):
+        return None
+
+    return vector_index_cache.get(
+        patient_id, lambda: _load_cached_vectorstore(storage_path), _index_generation(storage_path)
+    )
+
+
+def get_lexical_index(patient_id=None, document_id=None):
+    """
+    Retrieve the BM25 index built from the same chunks as the patient's vector store
+
+    Returns:
+        LexicalIndex: The patient's lexical index, or None if nothing is indexed
+    """
+    patient_id = _resolve_patient(patient_id, document_id)
+    if not patient_id:
+        return None
+
+    storage_path = _patient_index_path(patient_id)
+    if not os.path.exists(_lexical_index_path(storage_path)):
+        return None
+
+    return vector_index_cache.get(
+        f"{patient_id}:lexical", lambda: _load_lexical_index(storage_path), _index_generation(storage_path)
     )
 
+
+def _resolve_patient(patient_id, document_id):
+    if not patient_id and document_id:
+        return _load_manifest().get(document_id)
+    return patient_id
+
+
+def _get_tombstones(patient_id, storage_path):
+    return vector_index_cache.get(
+        f"{patient_id}:tombstones", lambda: _load_tombstones(storage_path), _index_generation(storage_path)
+    )
+
+
+def _lexical_search(lexical_index, vectorstore, query, k):
+    # Rows past the end belong to a lexical index newer than this vector
+    # store and are skipped until both are reloaded
+    return [
+        (_chunk_for_row(vectorstore, row), score)
+        for row, score in lexical_index.search(query, k=k)
+        if row in vectorstore.index_to_docstore_id
+    ]
+
 def semantic_search(query: str, patient_id=None, document_id=None, k=5):
     """
-    Perform semantic search on document vector stores
-    
+    Perform hybrid search on a patient's records
+
+    Dense vector search and BM25 keyword search run in parallel over the
+    same chunks, and their rankings are combined with reciprocal-rank
+    fusion so exact terms like drug names and lab codes still surface.
+
     Args:
         query (str): The search query
         patient_id (str, optional): Patient ID to search within their documents
-        document_id (str, optional): Specific document ID to search
+        document_id (str, optional): Restrict results to a specific document
         k (int): Number of results to return
-        
+
     Returns:
-        list: Relevant document chunks with metadata
+        list: Relevant document chunks with metadata, most relevant first
     """
-    # Get the appropriate vector store
+    # Get the appropriate indexes
     vectorstore = get_vectorstore(patient_id, document_id)
-    
-    # Perform the search
-    results = vectorstore.similarity_search_with_score(query, k=k)
-    
+    # Compaction leaves an empty index once every document is deleted
+    if vectorstore is None or vectorstore.index.ntotal == 0:
+        return []
+    lexical_index = get_lexical_index(patient_id, document_id)
+    patient_id = _resolve_patient(patient_id, document_id)
+    tombstones = _get_tombstones(patient_id, _patient_index_path(patient_id))
+
+    # Over-fetch so fusion and tombstone filtering still leave k results; a
+    # single-document search has to rank every chunk before filtering
+    fetch_k = min(k * 4 + len(tombstones), vectorstore.index.ntotal)
+    candidate_k = vectorstore.index.ntotal if document_id else fetch_k
+    lexical_future = None
+    if lexical_index is not None:
+        lexical_future = _search_executor.submit(_lexical_search, lexical_index, vectorstore, query, candidate_k)
+
+    # Perform the search, narrowing to one document when requested
+    search_kwargs = {"k": fetch_k}
+    if document_id:
+        search_kwargs["filter"] = {"document_id": document_id}
+        search_kwargs["fetch_k"] = candidate_k
+    vector_results = vectorstore.similarity_search_with_score(query, **search_kwargs)
+    lexical_results = lexical_future.result() if lexical_future else []
+
+    def is_live(doc):
+        if doc.metadata.get("chunk_id") in tombstones:
+            return False
+        return not document_id or doc.metadata.get("document_id") == document_id
+
+    # Combine both rankings with reciprocal-rank fusion
+    fused = {}
+    for source, results in (("vector_score", vector_results), ("lexical_score", lexical_results)):
+        results = [(doc, score) for doc, score in results if is_live(doc)]
+        for rank, (doc, score) in enumerate(results):
+            key = doc.metadata.get("chunk_id") or (doc.metadata.get("document_id"), doc.metadata.get("chunk"))
+            entry = fused.setdefault(key, {"doc": doc, "relevance_score": 0.0})
+            entry["relevance_score"] += 1.0 / (RRF_K + rank + 1)
+            entry[source] = float(score)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry["relevance_score"], reverse=True)[:k]
+
     # Format the results
     formatted_results = []
-    for doc, score in results:
+    for entry in ranked:
         formatted_results.append({
-            "content": doc.page_content,
-            "metadata": doc.metadata,
-            "relevance_score": float(score)
+            "content": entry["doc"].page_content,
+            "metadata": entry["doc"].metadata,
+            "relevance_score": entry["relevance_score"],
+            "vector_score": entry.get("vector_score"),
+            "lexical_score": entry.get("lexical_score")
         })
-    
-    return formatted_results
\ No newline at end of file
+
+    return formatted_results
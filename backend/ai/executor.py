@@ -0,0 +1,109 @@
+# backend/ai/executor.py
+"""
+Bounded thread pool for blocking AI work called from async routes.
+
+LLM calls and crew runs are synchronous and can take tens of seconds.
+Running them here keeps the event loop free for health checks, uploads and
+other users' requests, while AI_MAX_CONCURRENCY caps how many of them one
+worker runs at once; further calls wait their turn without blocking.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import functools
+import os
+import threading
+import time
+
+from .metrics import Histogram
+
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+
+_ai_executor = ThreadPoolExecutor(max_workers=AI_MAX_CONCURRENCY, thread_name_prefix="ai")
+
+_stats_lock = threading.Lock()
+_counters = {"submitted": 0, "running": 0, "completed": 0, "failed": 0}
+_queue_wait_ms = Histogram([1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 30000])
+_run_seconds = Histogram([0.1, 0.5, 1, 2, 5, 10, 20, 30, 60, 120])
+
+
+def _instrumented(func, submitted_at):
+    _queue_wait_ms.observe((time.perf_counter() - submitted_at) * 1000)
+    with _stats_lock:
+        _counters["running"] += 1
+    started = time.perf_counter()
+    failed = False
+    try:
+        return func()
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _run_seconds.observe(time.perf_counter() - started)
+        with _stats_lock:
+            _counters["running"] -= 1
+            _counters["failed" if failed else "completed"] += 1
+
+
+async def run_ai(func, *args, **kwargs):
+    """
+    Run a blocking AI call on the bounded pool and await its result
+
+    Args:
+        func (callable): Blocking function, e.g. a crew method
+        *args, **kwargs: Passed through to func
+
+    Returns:
+        The function's return value; exceptions propagate to the caller
+    """
+    with _stats_lock:
+        _counters["submitted"] += 1
+    call = functools.partial(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_ai_executor, _instrumented, call, time.perf_counter())
+
+
+@asynccontextmanager
+async def ai_slot():
+    """
+    Hold one of the pool's AI_MAX_CONCURRENCY slots while async AI work runs
+
+    For work that doesn't run in a thread, such as a streamed answer: a
+    pool thread is parked for the duration, so it waits its turn and counts
+    against the same limit as run_ai calls.
+    """
+    loop = asyncio.get_running_loop()
+    acquired = loop.create_future()
+    released = threading.Event()
+
+    def hold():
+        loop.call_soon_threadsafe(lambda: acquired.done() or acquired.set_result(None))
+        released.wait()
+
+    with _stats_lock:
+        _counters["submitted"] += 1
+    loop.run_in_executor(_ai_executor, _instrumented, hold, time.perf_counter())
+    try:
+        await acquired
+        yield
+    finally:
+        # Also frees a slot that hadn't started yet when the caller gave up
+        released.set()
+
+
+def get_ai_executor_stats():
+    """
+    Report how busy the AI pool is
+
+    Returns:
+        dict: Concurrency limit, call counters, queue-wait and run-time histograms
+    """
+    with _stats_lock:
+        counters = dict(_counters)
+    counters["queued"] = counters["submitted"] - counters["running"] - counters["completed"] - counters["failed"]
+    return {
+        "max_concurrency": AI_MAX_CONCURRENCY,
+        **counters,
+        "queue_wait_ms": _queue_wait_ms.snapshot(),
+        "run_seconds": _run_seconds.snapshot()
+    }
@@ -0,0 +1,84 @@
+# backend/ai/index_cache.py
+from collections import OrderedDict
+import threading
+
+
+class VectorIndexCache:
+    """
+    Bounded LRU cache of loaded vector stores.
+
+    Entries are charged by their on-disk size, which matches the resident
+    footprint of a fully loaded index and overestimates a memory-mapped one.
+    The least recently used stores are dropped once the budget is exceeded.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        # Bumped on invalidation so an in-flight load of old files isn't cached
+        self._generations = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, version=None):
+        """
+        Return the cached store for key, loading it on a miss
+
+        Args:
+            key (str): Cache key, e.g. the patient ID
+            loader (callable): Returns (store, size_bytes) when the key isn't cached
+            version (optional): Current on-disk version of the store; a cached
+                entry loaded at another version is reloaded. This is how writes
+                made by other processes reach this one.
+
+        Returns:
+            The cached or freshly loaded store
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self._generations.get(key, 0)
+
+        # Load outside the lock so one cold index doesn't block warm lookups
+        store, size = loader()
+
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return store
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (store, size, version)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+        return store
+
+    def invalidate(self, key):
+        """Drop a cached store after its index files have been rewritten"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
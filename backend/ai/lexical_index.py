@@ -0,0 +1,185 @@
+# backend/ai/lexical_index.py
+"""
+BM25 inverted index stored next to each patient's FAISS index.
+
+Documents are identified by their FAISS row number, so lexical and vector
+hits refer to the same chunks. The index is a list of immutable segments,
+one per append. Each segment keeps its postings as flat integer arrays
+that are memory-mapped on load, plus a small term dictionary pointing into
+them. Segments are merged once there are too many of them.
+"""
+from collections import Counter, defaultdict
+import json
+import math
+import numpy as np
+import os
+import re
+import shutil
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_SEGMENTS = 8
+
+
+def tokenize(text):
+    """Lowercase word/number tokens; keeps lab codes like hba1c and values like 7.2 intact"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class _Segment:
+    def __init__(self, path, meta):
+        self.path = path
+        self.row_start = meta["row_start"]
+        with open(os.path.join(path, "terms.json"), "r") as f:
+            self.terms = json.load(f)
+        self.rows = np.load(os.path.join(path, "rows.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(path, "tfs.npy"), mmap_mode="r")
+        self.doc_lens = np.load(os.path.join(path, "doc_lens.npy"), mmap_mode="r")
+
+    def postings(self, term):
+        entry = self.terms.get(term)
+        if entry is None:
+            return None, None
+        offset, length = entry
+        return self.rows[offset:offset + length], self.tfs[offset:offset + length]
+
+
+def _write_segment(path, row_start, texts):
+    """Write one segment covering rows row_start .. row_start + len(texts)"""
+    postings = defaultdict(list)
+    doc_lens = []
+    for i, text in enumerate(texts):
+        tokens = tokenize(text)
+        doc_lens.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings[term].append((row_start + i, tf))
+
+    terms = {}
+    rows = []
+    tfs = []
+    for term in sorted(postings):
+        terms[term] = [len(rows), len(postings[term])]
+        for row, tf in postings[term]:
+            rows.append(row)
+            tfs.append(tf)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "rows.npy"), np.asarray(rows, dtype=np.int32))
+    np.save(os.path.join(path, "tfs.npy"), np.minimum(np.asarray(tfs, dtype=np.int64), 65535).astype(np.uint16))
+    np.save(os.path.join(path, "doc_lens.npy"), np.asarray(doc_lens, dtype=np.int32))
+    with open(os.path.join(path, "terms.json"), "w") as f:
+        json.dump(terms, f)
+
+
+class LexicalIndex:
+    """Segmented BM25 index over the chunks of one patient index"""
+
+    def __init__(self, path):
+        self.path = path
+        self._load()
+
+    def _manifest_path(self):
+        return os.path.join(self.path, "segments.json")
+
+    def _load(self):
+        self.segments = []
+        if os.path.exists(self._manifest_path()):
+            with open(self._manifest_path(), "r") as f:
+                manifest = json.load(f)
+            self.segments = [
+                _Segment(os.path.join(self.path, meta["name"]), meta)
+                for meta in manifest["segments"]
+            ]
+        self.n_rows = sum(len(segment.doc_lens) for segment in self.segments)
+        total_len = sum(int(segment.doc_lens.sum()) for segment in self.segments)
+        self.avg_doc_len = total_len / self.n_rows if self.n_rows else 0.0
+
+    def _write_manifest(self, metas):
+        tmp_path = f"{self._manifest_path()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"segments": metas}, f)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _segment_metas(self):
+        return [
+            {"name": os.path.basename(segment.path), "row_start": segment.row_start}
+            for segment in self.segments
+        ]
+
+    def _next_segment_name(self):
+        existing = [int(name.split("_")[1]) for name in os.listdir(self.path) if name.startswith("seg_")]
+        return f"seg_{max(existing, default=0) + 1:06d}"
+
+    def add(self, row_start, texts):
+        """
+        Append a segment for newly indexed chunks
+
+        Args:
+            row_start (int): FAISS row number of the first text
+            texts (list): Chunk texts in row order
+        """
+        os.makedirs(self.path, exist_ok=True)
+        name = self._next_segment_name()
+        _write_segment(os.path.join(self.path, name), row_start, texts)
+        self._write_manifest(self._segment_metas() + [{"name": name, "row_start": row_start}])
+        self._load()
+
+    def rebuild(self, texts):
+        """
+        Replace every segment with a single one covering rows 0 .. len(texts)
+
+        Args:
+            texts (list): Chunk texts for every row, in row order
+        """
+        os.makedirs(self.path, exist_ok=True)
+        old_paths = [segment.path for segment in self.segments]
+        name = self._next_segment_name()
+        _write_segment(os.path.join(self.path, name), 0, texts)
+        self._write_manifest([{"name": name, "row_start": 0}])
+        self._load()
+        # Old files may still be mapped by readers; unlinking is safe on POSIX
+        for path in old_paths:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def needs_merge(self):
+        return len(self.segments) > MAX_SEGMENTS
+
+    def search(self, query, k=5):
+        """
+        Score rows against the query with BM25
+
+        Args:
+            query (str): Free-text query
+            k (int): Number of rows to return
+
+        Returns:
+            list: (row, score) pairs, best first
+        """
+        if not self.n_rows:
+            return []
+
+        terms = set(tokenize(query))
+        scores = defaultdict(float)
+        for term in terms:
+            matches = [segment.postings(term) + (segment,) for segment in self.segments]
+            matches = [m for m in matches if m[0] is not None]
+            doc_freq = sum(len(rows) for rows, _, _ in matches)
+            if not doc_freq:
+                continue
+            idf = math.log(1 + (self.n_rows - doc_freq + 0.5) / (doc_freq + 0.5))
+            for rows, tfs, segment in matches:
+                lens = segment.doc_lens[np.asarray(rows) - segment.row_start]
+                tf = np.asarray(tfs, dtype=np.float32)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lens / (self.avg_doc_len or 1))
+                for row, score in zip(rows.tolist(), (idf * tf * (BM25_K1 + 1) / (tf + norm)).tolist()):
+                    scores[row] += score
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def size_bytes(self):
+        total = 0
+        for root, _, files in os.walk(self.path):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return total
@@ -0,0 +1,42 @@
+# backend/ai/llm.py
+"""
+Shared chat model clients.
+
+Every agent and crew gets its ChatOpenAI from here, so clients are built
+once per process. Each client keeps its underlying OpenAI connection pool
+alive between calls, so requests reuse warm connections instead of
+paying a TLS handshake each time.
+"""
+from langchain.chat_models import ChatOpenAI
+import os
+import threading
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_llm(model="gpt-4", temperature=0, api_key=None):
+    """
+    Return a shared chat model client for the given settings
+
+    Args:
+        model (str): OpenAI model name
+        temperature (float): Sampling temperature
+        api_key (str, optional): API key, defaults to OPENAI_API_KEY
+
+    Returns:
+        ChatOpenAI: Client reused by every caller with the same settings
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    key = (model, temperature, api_key)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                api_key=api_key,
+                request_timeout=LLM_TIMEOUT_SECONDS
+            )
+        return _clients[key]
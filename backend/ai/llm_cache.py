@@ -0,0 +1,119 @@
+# backend/ai/llm_cache.py
+"""
+Persistent cache of deterministic (temperature 0) LLM responses.
+
+Entries are keyed by model, prompt template and the exact prompt inputs,
+so reprocessing a document or uploading a duplicate skips the round trip
+to the model. Changing a prompt template changes the key, which
+naturally invalidates old answers.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from .disk_cache import DiskCache
+from .rate_limit import acquire_llm_quota, call_with_backoff
+from .windowing import count_tokens
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./storage/cache/llm_responses.sqlite")
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", str(24 * 30)))
+# Set to skip the cache everywhere, e.g. while iterating on prompts
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+
+class LLMResponseCache:
+    """Disk-backed response cache with per-agent hit/miss counters"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._agent_stats = {}
+        self._lock = threading.Lock()
+
+    def _key(self, chain, inputs):
+        llm = chain.llm
+        payload = json.dumps({
+            "model": getattr(llm, "model_name", type(llm).__name__),
+            "temperature": getattr(llm, "temperature", None),
+            "template": chain.prompt.template,
+            "inputs": inputs
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _record(self, agent, hit):
+        with self._lock:
+            stats = self._agent_stats.setdefault(agent, {"hits": 0, "misses": 0, "bypassed": 0})
+            stats[hit] += 1
+
+    def _call(self, chain, inputs):
+        # Only calls that reach the provider count against its quota; each
+        # retry after a 429 waits for quota again
+        prompt_tokens = count_tokens(chain.prompt.format(**inputs))
+
+        def attempt():
+            acquire_llm_quota(prompt_tokens)
+            return chain.run(**inputs)
+
+        return call_with_backoff(attempt)
+
+    def run(self, agent, chain, use_cache=True, **inputs):
+        """
+        Run an LLMChain, answering from the cache when the same call was made before
+
+        Args:
+            agent (str): Name used for per-agent metrics
+            chain (LLMChain): The chain to run on a miss
+            use_cache (bool): Set to False to force a fresh model call
+            **inputs: Prompt inputs passed to chain.run
+
+        Returns:
+            str: The model's response
+        """
+        if not use_cache or LLM_CACHE_DISABLED:
+            self._record(agent, "bypassed")
+            return self._call(chain, inputs)
+
+        key = self._key(chain, inputs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._record(agent, "hits")
+            return cached.decode("utf-8")
+
+        self._record(agent, "misses")
+        result = self._call(chain, inputs)
+        self.cache.set(key, result.encode("utf-8"))
+        return result
+
+    def stats(self):
+        """
+        Report overall cache usage and hit rates per agent
+
+        Returns:
+            dict: Cache statistics plus an "agents" breakdown
+        """
+        with self._lock:
+            agents = {}
+            for agent, stats in self._agent_stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                agents[agent] = {**stats, "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0}
+        return {"disabled": LLM_CACHE_DISABLED, **self.cache.stats(), "agents": agents}
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    Return the process-wide LLM response cache, opening it on first use
+    """
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache(DiskCache(
+                LLM_CACHE_PATH,
+                LLM_CACHE_MAX_MB * 1024 * 1024,
+                ttl_seconds=LLM_CACHE_TTL_HOURS * 3600
+            ))
+        return _llm_cache
@@ -0,0 +1,54 @@
+# backend/ai/metrics.py
+"""
+Lightweight in-process metrics used to tune the AI pipeline.
+"""
+import bisect
+import threading
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram with approximate percentiles"""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def _percentile(self, fraction):
+        # Upper bound of the bucket holding the requested rank
+        rank = fraction * self._count
+        seen = 0
+        for i, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[i] if i < len(self.buckets) else self._max
+        return 0.0
+
+    def snapshot(self):
+        """
+        Summarize the observations so far
+
+        Returns:
+            dict: Count, mean, max, approximate p50/p95/p99 and per-bucket counts
+        """
+        with self._lock:
+            labels = [f"le_{bound}" for bound in self.buckets] + ["inf"]
+            return {
+                "count": self._count,
+                "mean": round(self._sum / self._count, 4) if self._count else 0.0,
+                "max": self._max,
+                "p50": self._percentile(0.50),
+                "p95": self._percentile(0.95),
+                "p99": self._percentile(0.99),
+                "buckets": dict(zip(labels, self._counts))
+            }
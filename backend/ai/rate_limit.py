@@ -0,0 +1,215 @@
+# backend/ai/rate_limit.py
+"""
+Process-wide rate limiting for calls to the LLM provider.
+
+Two token buckets mirror the provider's quotas: requests per minute and
+tokens per minute. Short bursts go through immediately, while the
+sustained rate stays under the quota. When the provider still answers
+429, every caller backs off, not only the one that got the error.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "40000"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+# Tokens budgeted for each answer, on top of the prompt
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "500"))
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+
+
+class RateLimiter:
+    """Thread-safe token bucket"""
+
+    def __init__(self, rate_per_second, burst):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+        self.acquired = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """
+        Block until amount units may be spent
+
+        Args:
+            amount (float): Units to take; capped at the burst size so large requests can't wait forever
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        amount = min(amount, self.burst)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= amount:
+                    self._tokens -= amount
+                    waited = now - started
+                    self.waited_seconds += waited
+                    self.acquired += amount
+                    return waited
+                delay = max(self._paused_until - now, (amount - self._tokens) / self.rate_per_second)
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Hold every caller for the given time and empty the bucket"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "per_minute": round(self.rate_per_second * 60, 2),
+                "burst": self.burst,
+                "available": round(self._tokens, 2),
+                "acquired": round(self.acquired, 2),
+                "waited_seconds": round(self.waited_seconds, 3),
+                "paused_for_seconds": round(max(0.0, self._paused_until - now), 3)
+            }
+
+
+_request_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE / 60, LLM_BURST)
+# A full minute of tokens may be spent at once, as the provider allows
+_token_limiter = RateLimiter(LLM_TOKENS_PER_MINUTE / 60, LLM_TOKENS_PER_MINUTE)
+_retries = {"rate_limited": 0, "retried": 0, "gave_up": 0}
+_retries_lock = threading.Lock()
+
+
+def acquire_llm_quota(prompt_tokens):
+    """
+    Block until one request with the given prompt size fits in the quota
+
+    Args:
+        prompt_tokens (int): Tokens in the prompt
+
+    Returns:
+        float: Seconds spent waiting
+    """
+    return (
+        _request_limiter.acquire(1)
+        + _token_limiter.acquire(prompt_tokens + LLM_EXPECTED_OUTPUT_TOKENS)
+    )
+
+
+def _is_rate_limit_error(error):
+    if type(error).__name__ == "RateLimitError":
+        return True
+    return 429 in (getattr(error, "status_code", None), getattr(error, "http_status", None))
+
+
+def _retry_after(error):
+    # Honour the provider's hint when the error carries response headers
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(error, attempt):
+    # Seconds to wait before retrying after error, or None if it must be raised
+    if not _is_rate_limit_error(error):
+        return None
+    with _retries_lock:
+        _retries["rate_limited"] += 1
+        if attempt == LLM_MAX_RETRIES:
+            _retries["gave_up"] += 1
+        else:
+            _retries["retried"] += 1
+    if attempt == LLM_MAX_RETRIES:
+        return None
+    delay = _retry_after(error) or min(
+        LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt
+    ) * random.uniform(0.5, 1.0)
+    # We're over quota, so nobody else should send either
+    _request_limiter.pause(delay)
+    return delay
+
+
+def call_with_backoff(func):
+    """
+    Call func, retrying with jittered exponential backoff when the provider answers 429
+
+    Args:
+        func (callable): The LLM call, without arguments
+
+    Returns:
+        The function's return value
+    """
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return func()
+        except Exception as error:
+            delay = _backoff_delay(error, attempt)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+async def astream_with_backoff(open_stream, prompt_tokens):
+    """
+    Open a streaming LLM call within the quota, backing off on 429 like call_with_backoff
+
+    Quota is taken and 429s are retried when the stream is opened, i.e. up
+    to its first chunk; after that the chunks already sent can't be
+    taken back, so a failure is raised.
+
+    Args:
+        open_stream (callable): Returns a new async iterator of chunks, e.g. llm.astream
+        prompt_tokens (int): Tokens in the prompt
+
+    Yields:
+        The stream's chunks in order
+    """
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        # The buckets block, so wait for them off the event loop
+        await asyncio.to_thread(acquire_llm_quota, prompt_tokens)
+        stream = open_stream()
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            return
+        except Exception as error:
+            delay = _backoff_delay(error, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        yield first
+        async for chunk in stream:
+            yield chunk
+        return
+
+
+def get_llm_rate_limit_stats():
+    """
+    Report quota usage, time spent waiting and 429 retries
+
+    Returns:
+        dict: Request and token bucket state plus retry counters
+    """
+    with _retries_lock:
+        retries = dict(_retries)
+    return {
+        "requests": _request_limiter.stats(),
+        "tokens": _token_limiter.stats(),
+        "retries": retries
+    }
@@ -0,0 +1,157 @@
+# backend/ai/task_graph.py
+"""
+Small dependency-graph runner for the document pipeline.
+
+Tasks declare which other tasks they depend on; every task whose
+dependencies are done is started right away, up to a bounded number of
+threads shared by the whole process. Each run reports per-task timings and
+the critical path, i.e. the longest chain of dependent tasks, which is the
+lower bound on the run's wall-clock time.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import os
+import time
+
+# Upper bound on tasks running at once across all documents
+CREW_MAX_PARALLEL_TASKS = int(os.getenv("CREW_MAX_PARALLEL_TASKS", "8"))
+
+_task_executor = ThreadPoolExecutor(max_workers=CREW_MAX_PARALLEL_TASKS, thread_name_prefix="crew-task")
+
+
+class TaskGraph:
+    """A set of named tasks with explicit dependencies"""
+
+    def __init__(self):
+        self._tasks = {}
+
+    def add(self, name, func, depends_on=()):
+        """
+        Register a task
+
+        Args:
+            name (str): Unique task name; its result is stored under this key
+            func (callable): Called with a dict of the results of its dependencies
+            depends_on (tuple): Names of tasks that must finish first
+
+        Returns:
+            TaskGraph: self, so calls can be chained
+        """
+        if name in self._tasks:
+            raise ValueError(f"Task {name} is already in the graph")
+        self._tasks[name] = (func, tuple(depends_on))
+        return self
+
+    def _check(self):
+        for name, (_, depends_on) in self._tasks.items():
+            for dependency in depends_on:
+                if dependency not in self._tasks:
+                    raise ValueError(f"Task {name} depends on unknown task {dependency}")
+
+        # Kahn's algorithm; anything left over is part of a cycle
+        remaining = {name: set(depends_on) for name, (_, depends_on) in self._tasks.items()}
+        while True:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            raise ValueError(f"Task graph has a cycle through: {', '.join(sorted(remaining))}")
+
+    def run(self, precomputed=None, executor=None, on_task_done=None):
+        """
+        Run every task, starting each as soon as its dependencies are done
+
+        Args:
+            precomputed (dict, optional): Results to use instead of running those tasks;
+                tasks that only feed precomputed ones are skipped too
+            executor (Executor, optional): Where to run tasks, defaults to the shared pool
+            on_task_done (callable, optional): Called with each task's name and result as it finishes
+
+        Returns:
+            tuple: (results dict keyed by task name, timings dict)
+        """
+        self._check()
+        executor = executor or _task_executor
+        results = dict(precomputed or {})
+        spans = {}
+        needed = self._needed(results)
+        pending = {name: task for name, task in self._tasks.items() if name in needed}
+        running = {}
+        started = time.perf_counter()
+
+        def timed(name, func, inputs):
+            task_started = time.perf_counter()
+            try:
+                return func(inputs)
+            finally:
+                spans[name] = (task_started - started, time.perf_counter() - started)
+
+        try:
+            while pending or running:
+                for name, (func, depends_on) in list(pending.items()):
+                    if all(dependency in results for dependency in depends_on):
+                        inputs = {dependency: results[dependency] for dependency in depends_on}
+                        running[executor.submit(timed, name, func, inputs)] = name
+                        del pending[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    if on_task_done:
+                        on_task_done(name, results[name])
+        finally:
+            # Don't leave siblings of a failed task running unobserved
+            for future in running:
+                future.cancel()
+
+        return results, self._timings(spans, time.perf_counter() - started)
+
+    def _needed(self, results):
+        # Tasks nothing depends on are the outputs; walk back from the ones not already known
+        dependents = set()
+        for _, depends_on in self._tasks.values():
+            dependents.update(depends_on)
+        needed = set()
+        stack = [name for name in self._tasks if name not in dependents and name not in results]
+        while stack:
+            name = stack.pop()
+            if name in needed:
+                continue
+            needed.add(name)
+            stack.extend(d for d in self._tasks[name][1] if d not in results)
+        return needed
+
+    def _timings(self, spans, wall_seconds):
+        durations = {name: end - start for name, (start, end) in spans.items()}
+
+        # Longest chain of dependent tasks, by summed duration
+        longest = {}
+
+        def chain(name):
+            if name not in longest:
+                depends_on = [d for d in self._tasks[name][1] if d in durations]
+                best = max((chain(d) for d in depends_on), key=lambda c: c[0], default=(0.0, []))
+                longest[name] = (best[0] + durations.get(name, 0.0), best[1] + [name])
+            return longest[name]
+
+        critical_seconds, critical_path = max(
+            (chain(name) for name in durations), key=lambda c: c[0], default=(0.0, [])
+        )
+        busy_seconds = sum(durations.values())
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "critical_path": critical_path,
+            "critical_path_seconds": round(critical_seconds, 3),
+            # Share of wall time explained by the critical path; the rest is scheduling overhead
+            "critical_path_ratio": round(critical_seconds / wall_seconds, 3) if wall_seconds else 0.0,
+            # Time the same tasks would have taken back to back
+            "sequential_seconds": round(busy_seconds, 3),
+            "tasks": {
+                name: {"start": round(start, 3), "end": round(end, 3), "seconds": round(end - start, 3)}
+                for name, (start, end) in spans.items()
+            }
+        }
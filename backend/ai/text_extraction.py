@@ -0,0 +1,247 @@
+# backend/ai/text_extraction.py
+"""
+Text extraction for uploaded documents, by file type.
+
+PDFs are handled page by page in a process pool: a page with an embedded
+text layer is read directly, and only pages without one (scans, faxes) are
+rasterized and OCR'd. Images are OCR'd, office formats go through
+unstructured, and plain text is read as is.
+
+Extraction starts as soon as a document is opened and pages come back in
+order as they finish, so embeddings (and agents reading only a capped
+start of the document) don't wait for the rest of a long scan.
+
+pdfminer.six, pdf2image (with poppler), pytesseract (with tesseract) and
+unstructured are all optional; a file type whose loader isn't installed
+raises TextExtractionError.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+
+from .chunking import iter_file_text
+from .checkpoints import fingerprint
+
+try:
+    from pdfminer.high_level import extract_text as pdfminer_extract_text
+    from pdfminer.pdfpage import PDFPage
+except ImportError:  # pragma: no cover - optional dependency
+    pdfminer_extract_text = None
+    PDFPage = None
+
+try:
+    from pdf2image import convert_from_path, pdfinfo_from_path
+except ImportError:  # pragma: no cover - optional dependency
+    convert_from_path = None
+    pdfinfo_from_path = None
+
+try:
+    import pytesseract
+except ImportError:  # pragma: no cover - optional dependency
+    pytesseract = None
+
+# Processes for page extraction; OCR is CPU-bound, so default to every core
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", str(os.cpu_count() or 1)))
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+# A page with less embedded text than this is treated as a scan
+OCR_MIN_EMBEDDED_CHARS = int(os.getenv("OCR_MIN_EMBEDDED_CHARS", "20"))
+
+# Bump when a loader changes what text it produces
+TEXT_EXTRACTION_CODE_VERSION = 1
+
+PLAIN_TEXT_EXTENSIONS = {"", ".txt", ".text", ".md", ".csv", ".tsv", ".json", ".xml", ".hl7"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".gif"}
+
+_page_executor = None
+_page_executor_lock = threading.Lock()
+
+
+class TextExtractionError(RuntimeError):
+    """Raised when a document's text can't be extracted"""
+
+
+def _get_page_executor():
+    global _page_executor
+    with _page_executor_lock:
+        if _page_executor is None:
+            # Spawn rather than fork: the callers are multi-threaded
+            _page_executor = ProcessPoolExecutor(
+                max_workers=OCR_MAX_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _page_executor
+
+
+def _ocr_image(image):
+    if pytesseract is None:
+        raise TextExtractionError("pytesseract is not installed; can't OCR scanned pages")
+    return pytesseract.image_to_string(image, lang=OCR_LANGUAGE)
+
+
+def _pdf_page_text(file_path, page_index):
+    # Runs in a pool process; returns (text, method)
+    if pdfminer_extract_text is not None:
+        text = pdfminer_extract_text(file_path, page_numbers=[page_index])
+        if len(text.strip()) >= OCR_MIN_EMBEDDED_CHARS:
+            return text, "embedded"
+    if convert_from_path is None:
+        raise TextExtractionError("pdf2image is not installed; can't rasterize scanned pages")
+    images = convert_from_path(file_path, dpi=OCR_DPI, first_page=page_index + 1, last_page=page_index + 1)
+    return "\n".join(_ocr_image(image) for image in images), "ocr"
+
+
+def _image_text(file_path):
+    if pytesseract is None:
+        raise TextExtractionError("pytesseract is not installed; can't OCR images")
+    from PIL import Image
+
+    with Image.open(file_path) as image:
+        return _ocr_image(image), "ocr"
+
+
+def _partitioned_text(file_path):
+    try:
+        from unstructured.partition.auto import partition
+    except ImportError:
+        raise TextExtractionError("unstructured is not installed; can't read this file type")
+    return "\n\n".join(str(element) for element in partition(filename=file_path)), "unstructured"
+
+
+def _pdf_page_count(file_path):
+    if PDFPage is not None:
+        with open(file_path, "rb") as f:
+            return sum(1 for _ in PDFPage.get_pages(f))
+    if pdfinfo_from_path is not None:
+        return int(pdfinfo_from_path(file_path)["Pages"])
+    raise TextExtractionError("Neither pdfminer.six nor pdf2image is installed; can't read PDFs")
+
+
+class ExtractedText:
+    """
+    Text of one document, extracted in the background
+
+    Pages are submitted to the pool when the object is created; reading
+    blocks only until the pages needed so far are done. Given save_to, the
+    full text is written there as soon as the last page is extracted,
+    whatever happens to the caller afterwards.
+    """
+
+    def __init__(self, file_path, save_to=None):
+        self.file_path = file_path
+        self.started = time.perf_counter()
+        self._futures = []
+        extension = os.path.splitext(file_path)[1].lower()
+
+        if extension in PLAIN_TEXT_EXTENSIONS:
+            self.kind = "text"
+            return
+
+        executor = _get_page_executor()
+        if extension == ".pdf":
+            self.kind = "pdf"
+            self._futures = [
+                executor.submit(_pdf_page_text, file_path, page_index)
+                for page_index in range(_pdf_page_count(file_path))
+            ]
+        elif extension in IMAGE_EXTENSIONS:
+            self.kind = "image"
+            self._futures = [executor.submit(_image_text, file_path)]
+        else:
+            self.kind = "document"
+            self._futures = [executor.submit(_partitioned_text, file_path)]
+        if save_to:
+            self._save_when_done(save_to)
+
+    def _save_when_done(self, path):
+        remaining = [len(self._futures)]
+        lock = threading.Lock()
+
+        def on_page_done(_):
+            # Runs on the pool's callback thread; every page is in memory by
+            # the last call, so the write doesn't block on anything
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            if any(future.cancelled() or future.exception() is not None for future in self._futures):
+                return
+            try:
+                self.save(path)
+            except OSError:
+                # A missing sidecar only means a retry extracts the text again
+                pass
+
+        for future in self._futures:
+            future.add_done_callback(on_page_done)
+
+    def iter_pages(self):
+        """
+        Yield page texts in document order, each as soon as it's ready
+
+        Yields:
+            str: Text of the next page (or block, for plain text files)
+        """
+        if self.kind == "text":
+            yield from iter_file_text(self.file_path)
+            return
+        for future in self._futures:
+            text, _ = future.result()
+            yield text + "\n\n"
+
+    def save(self, path):
+        """
+        Write the full text to path, waiting for any pages still in progress
+        """
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, "w") as f:
+            for text in self.iter_pages():
+                f.write(text)
+        os.replace(tmp_path, path)
+
+    def done(self):
+        """True once every page has been extracted"""
+        return all(future.done() for future in self._futures)
+
+    def cancel(self):
+        """Drop pages that haven't started, e.g. when a later stage failed"""
+        for future in self._futures:
+            future.cancel()
+
+    def stats(self):
+        methods = {}
+        for future in self._futures:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                method = future.result()[1]
+                methods[method] = methods.get(method, 0) + 1
+        return {
+            "kind": self.kind,
+            "pages": len(self._futures) or None,
+            "pages_by_method": methods,
+            "seconds": round(time.perf_counter() - self.started, 3)
+        }
+
+
+def text_extraction_version():
+    """Version of extracted text; changes with the loaders and OCR settings"""
+    return fingerprint(TEXT_EXTRACTION_CODE_VERSION, OCR_DPI, OCR_LANGUAGE, OCR_MIN_EMBEDDED_CHARS)
+
+
+def open_document_text(file_path, save_to=None):
+    """
+    Start extracting a document's text
+
+    Args:
+        file_path (str): Path to the stored document
+        save_to (str, optional): Where to write the full text once extraction finishes
+
+    Returns:
+        ExtractedText: Handle to read the text from as it becomes available
+
+    Raises:
+        TextExtractionError: If no loader for the file type is installed
+    """
+    return ExtractedText(file_path, save_to=save_to)
@@ -0,0 +1,172 @@
+# backend/ai/vector_index.py
+"""
+Builders for the FAISS index types available behind the patient vector stores.
+
+flat  - exact search, 4 bytes per dimension
+hnsw  - graph index over full vectors, faster search, slightly more memory
+sq8   - int8 scalar quantization, 1 byte per dimension
+ivf   - inverted lists over full vectors, searches a subset of clusters
+pq    - inverted lists with product-quantized codes, dim / 8 bytes per vector
+
+Quantized and clustered types need a training pass over sample vectors
+before vectors can be added; build_index handles that.
+"""
+import faiss
+import numpy as np
+import os
+import time
+
+INDEX_TYPES = ("flat", "hnsw", "sq8", "ivf", "pq")
+
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat")
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "16"))
+
+# Below these sizes a patient index stays flat; training on too few
+# vectors gives poor clusters and exact search is fast anyway
+MIN_TRAINING_VECTORS = {
+    "flat": 0,
+    "hnsw": 0,
+    "sq8": 256,
+    "ivf": 1024,
+    "pq": 4096
+}
+
+
+def _nlist(n_vectors):
+    # Roughly sqrt(n) clusters keeps ~40+ training points per centroid
+    return max(1, min(65536, int(np.sqrt(n_vectors))))
+
+
+def index_factory_string(index_type, dim, n_vectors):
+    """
+    Translate an index type into a FAISS index_factory description
+
+    Args:
+        index_type (str): One of INDEX_TYPES
+        dim (int): Vector dimension
+        n_vectors (int): Number of vectors the index will be trained on
+
+    Returns:
+        str: FAISS factory string
+    """
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return "HNSW32"
+    if index_type == "sq8":
+        return "SQ8"
+    if index_type == "ivf":
+        return f"IVF{_nlist(n_vectors)},Flat"
+    if index_type == "pq":
+        # About 8 dimensions per sub-quantizer, one byte per code
+        sub_quantizers = next(m for m in range(max(1, dim // 8), 0, -1) if dim % m == 0)
+        return f"IVF{_nlist(n_vectors)},PQ{sub_quantizers}x8"
+    raise ValueError(f"Unknown vector index type: {index_type}")
+
+
+def configure_search(index):
+    """Apply search-time parameters that aren't fixed at build time"""
+    try:
+        faiss.extract_index_ivf(index).nprobe = VECTOR_INDEX_NPROBE
+    except RuntimeError:
+        # Not an IVF index
+        pass
+    return index
+
+
+def build_index(vectors, index_type):
+    """
+    Create, train and populate an index of the requested type
+
+    Args:
+        vectors (np.ndarray): float32 matrix, one row per chunk, in index order
+        index_type (str): One of INDEX_TYPES
+
+    Returns:
+        faiss.Index: Populated index whose row i is vectors[i]
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+    index = faiss.index_factory(dim, index_factory_string(index_type, dim, n_vectors))
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return configure_search(index)
+
+
+def target_index_type(n_vectors, index_type=None):
+    """
+    Pick the index type a store of n_vectors should use
+
+    Args:
+        n_vectors (int): Number of vectors in the store
+        index_type (str, optional): Requested type, defaults to VECTOR_INDEX_TYPE
+
+    Returns:
+        str: The requested type, or "flat" until there is enough data to train it
+    """
+    index_type = index_type or VECTOR_INDEX_TYPE
+    if n_vectors < MIN_TRAINING_VECTORS.get(index_type, 0):
+        return "flat"
+    return index_type
+
+
+def _index_bytes(index):
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def recall_report(vectors, index_types=INDEX_TYPES, k=10, n_queries=200, seed=0):
+    """
+    Compare index types against exact flat search on the same vectors
+
+    Queries are sampled from the stored vectors with a little noise added,
+    which approximates real queries landing near existing chunks.
+
+    Args:
+        vectors (np.ndarray): float32 matrix of stored vectors
+        index_types (tuple): Index types to evaluate
+        k (int): Neighbours per query
+        n_queries (int): Number of sampled queries
+        seed (int): RNG seed so reports are comparable between runs
+
+    Returns:
+        dict: Per index type recall@k, build time, latency and bytes per vector
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+    k = min(k, n_vectors)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(n_vectors, size=min(n_queries, n_vectors), replace=False)
+    queries = vectors[sample] + rng.normal(0, 0.01, size=(len(sample), dim)).astype(np.float32)
+
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    report = {"n_vectors": n_vectors, "dim": dim, "k": k, "n_queries": len(sample), "index_types": {}}
+    for index_type in index_types:
+        if n_vectors < MIN_TRAINING_VECTORS.get(index_type, 0):
+            report["index_types"][index_type] = {"skipped": "not enough vectors to train"}
+            continue
+
+        started = time.perf_counter()
+        index = build_index(vectors, index_type)
+        build_seconds = time.perf_counter() - started
+
+        latencies = []
+        found = np.empty_like(truth)
+        for i, query in enumerate(queries):
+            started = time.perf_counter()
+            _, ids = index.search(query.reshape(1, -1), k)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found[i] = ids[0]
+
+        hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+        report["index_types"][index_type] = {
+            "recall_at_k": round(hits / (len(queries) * k), 4),
+            "build_seconds": round(build_seconds, 3),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 3),
+            "bytes_per_vector": round(_index_bytes(index) / n_vectors, 1)
+        }
+    return report
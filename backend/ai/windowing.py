@@ -0,0 +1,195 @@
+# backend/ai/windowing.py
+"""
+Token-aware splitting of whole documents into prompt-sized windows, and
+merging of the JSON extracted from each window.
+
+Token counts come from tiktoken when it is installed, otherwise from a
+characters-per-token estimate that errs on the side of smaller windows.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# Document tokens per prompt; leaves room for the template and the answer
+AGENT_WINDOW_TOKENS = int(os.getenv("AGENT_WINDOW_TOKENS", "1500"))
+AGENT_WINDOW_OVERLAP_TOKENS = int(os.getenv("AGENT_WINDOW_OVERLAP_TOKENS", "100"))
+# Document tokens the agents read; 0 reads whole documents. Setting a cap
+# bounds LLM calls per document, and documents cut off by it are flagged
+AGENT_MAX_DOCUMENT_TOKENS = int(os.getenv("AGENT_MAX_DOCUMENT_TOKENS", "0"))
+# Windows processed at once across the process; the rate limiter paces them further
+AGENT_WINDOW_CONCURRENCY = int(os.getenv("AGENT_WINDOW_CONCURRENCY", "8"))
+
+# Conservative for clinical text, which is number- and abbreviation-heavy
+_CHARS_PER_TOKEN = 3
+
+_encoding = None
+
+_window_executor = ThreadPoolExecutor(max_workers=AGENT_WINDOW_CONCURRENCY, thread_name_prefix="agent-window")
+
+
+def count_tokens(text, model="gpt-4"):
+    """
+    Count the tokens text takes up in a prompt
+
+    Args:
+        text (str): Text to measure
+        model (str): Model whose tokenizer to use
+
+    Returns:
+        int: Exact count with tiktoken, otherwise an estimate
+    """
+    if tiktoken is None:
+        return len(text) // _CHARS_PER_TOKEN + 1
+    return len(_get_encoding(model).encode(text))
+
+
+def _get_encoding(model):
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.encoding_for_model(model)
+    return _encoding
+
+
+def _cut_tokens(text, max_tokens):
+    if tiktoken is None:
+        return text[:max_tokens * _CHARS_PER_TOKEN]
+    encoding = _get_encoding("gpt-4")
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+
+def read_document_tokens(blocks, max_tokens=AGENT_MAX_DOCUMENT_TOKENS):
+    """
+    Join a document's text blocks, up to a token budget
+
+    Blocks past the budget aren't read, so a capped read of a long scan
+    doesn't wait for the pages it won't use.
+
+    Args:
+        blocks (iterable): Text blocks in document order, e.g. ExtractedText.iter_pages()
+        max_tokens (int): Token budget; 0 reads everything
+
+    Returns:
+        tuple: (text, truncated), truncated saying whether the budget cut the text short
+    """
+    parts = []
+    tokens = 0
+    truncated = False
+    for block in blocks:
+        if max_tokens and tokens >= max_tokens:
+            truncated = True
+            break
+        parts.append(block)
+        tokens += count_tokens(block)
+    text = "".join(parts)
+    if max_tokens and tokens > max_tokens:
+        text, truncated = _cut_tokens(text, max_tokens), True
+    return text, truncated
+
+
+def split_windows(text, max_tokens=AGENT_WINDOW_TOKENS, overlap_tokens=AGENT_WINDOW_OVERLAP_TOKENS):
+    """
+    Split a document into windows that each fit in one prompt
+
+    Splits on paragraph and line boundaries where possible, so a table row
+    or a lab result isn't cut in half.
+
+    Args:
+        text (str): The whole document
+        max_tokens (int): Token budget per window
+        overlap_tokens (int): Tokens repeated between neighbouring windows
+
+    Returns:
+        list: Window texts in document order, covering the whole text
+    """
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=max_tokens,
+        chunk_overlap=overlap_tokens,
+        length_function=count_tokens
+    )
+    return splitter.split_text(text)
+
+
+def first_window(text, max_tokens=AGENT_WINDOW_TOKENS):
+    """
+    Return the window a document starts with, without splitting the rest of it
+    """
+    # Well above any real chars-per-token ratio, so the prefix holds a full window
+    return split_windows(text[:max_tokens * 8], max_tokens=max_tokens)[0]
+
+
+def map_windows(func, windows):
+    """
+    Apply func to every window concurrently
+
+    Args:
+        func (callable): Called with one window's text
+        windows (list): Window texts
+
+    Returns:
+        list: Results in window order
+    """
+    if len(windows) == 1:
+        return [func(windows[0])]
+    return list(_window_executor.map(func, windows))
+
+
+def _is_empty(value):
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _identity(value):
+    # Case- and whitespace-insensitive identity, for spotting the same entry twice
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    return json.dumps(value, sort_keys=True, default=str).lower()
+
+
+def merge_extractions(parts):
+    """
+    Merge JSON objects extracted from the windows of one document
+
+    Objects are merged key by key. Lists are concatenated without duplicate
+    entries, so a result repeated by overlapping windows appears once. For
+    single values the first window that has one wins, since headers
+    (patient, dates, physician) appear at the start of a document.
+
+    Args:
+        parts (list): Extracted values in window order
+
+    Returns:
+        The merged value
+    """
+    parts = [part for part in parts if not _is_empty(part)]
+    if not parts:
+        return {}
+
+    if all(isinstance(part, dict) for part in parts):
+        merged = {}
+        for part in parts:
+            for key, value in part.items():
+                merged.setdefault(key, [])
+                merged[key].append(value)
+        return {key: merge_extractions(values) for key, values in merged.items()}
+
+    if any(isinstance(part, list) for part in parts):
+        merged = []
+        seen = set()
+        for part in parts:
+            for item in part if isinstance(part, list) else [part]:
+                identity = _identity(item)
+                if identity not in seen:
+                    seen.add(identity)
+                    merged.append(item)
+        return merged
+
+    return parts[0]
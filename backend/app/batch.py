@@ -0,0 +1,89 @@
+# backend/app/batch.py
+"""
+Batches of documents for onboarding many at once.
+
+A batch is a set of jobs on the durable queue sharing a batch ID; the
+queue workers (app/worker.py) process them alongside single uploads, so
+batch throughput is set by how many workers run and by the LLM quota.
+Progress is read back from the queue, so any API process can report it.
+"""
+import time
+import uuid
+
+from .job_queue import get_job_queue
+
+
+def start_batch_job(document_ids):
+    """
+    Queue documents for processing as one batch
+
+    Args:
+        document_ids (list): Documents to process
+
+    Returns:
+        str: The batch ID
+    """
+    queue = get_job_queue()
+    batch_id = str(uuid.uuid4())
+    for document_id in document_ids:
+        queue.enqueue(document_id, batch_id=batch_id)
+    return batch_id
+
+
+def get_batch_progress(batch_id):
+    """
+    Report completion, throughput and estimated time remaining
+
+    Documents that already had a job in flight when the batch was created
+    are counted with that job, not the batch.
+
+    Args:
+        batch_id (str): Batch ID from start_batch_job
+
+    Returns:
+        dict: Batch status and counters, or None if the batch doesn't exist
+    """
+    queue = get_job_queue()
+    counts = queue.counts(batch_id)
+    total = sum(counts.values())
+    if not total:
+        return None
+
+    processed = counts.get("done", 0)
+    failed = counts.get("failed", 0)
+    cancelled = counts.get("cancelled", 0)
+    remaining = counts.get("queued", 0) + counts.get("leased", 0)
+    done = processed + failed
+
+    _, started_at, finished_at = queue.batch_timing(batch_id)
+    if remaining:
+        status = "running" if started_at else "queued"
+        finished_at = None
+    else:
+        status = "cancelled" if cancelled else "completed"
+    elapsed = ((finished_at or time.time()) - started_at) if started_at else 0.0
+    per_second = done / elapsed if elapsed else 0.0
+
+    return {
+        "job_id": batch_id,
+        "status": status,
+        "total": total,
+        "processed": processed,
+        "failed": failed,
+        "cancelled": cancelled,
+        "remaining": remaining,
+        "percent": round(100 * (done + cancelled) / total, 1),
+        "elapsed_seconds": round(elapsed, 1),
+        "documents_per_minute": round(per_second * 60, 2),
+        "eta_seconds": round(remaining / per_second, 1) if per_second and remaining else None
+    }
+
+
+def cancel_batch_job(batch_id):
+    """
+    Stop a batch's queued documents from starting; running ones finish
+
+    Returns:
+        list: IDs of the documents that won't be processed
+    """
+    return get_job_queue().cancel_batch(batch_id)
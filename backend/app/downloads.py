@@ -0,0 +1,238 @@
+# backend/app/downloads.py
+"""
+Conditional and ranged file responses for stored documents.
+
+Strong ETags come from the document's content hash, so a browser that
+already has the file gets a 304 instead of the bytes, and a single
+Range request (e.g. a PDF viewer paging through a large report) gets a
+206 with just that slice. Files are sent in fixed-size chunks, never read
+whole; when the ASGI server offers the zero-copy send extension the
+kernel copies the file to the socket instead.
+
+Browsers and PDF viewers fetch the file URL themselves, without the app's
+auth header, so it is opened with a short-lived signed token handed out
+by an authenticated endpoint.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import stat
+import time
+from email.utils import formatdate
+
+import anyio
+from fastapi.responses import FileResponse, Response
+
+DOWNLOAD_CHUNK_BYTES = int(os.getenv("DOWNLOAD_CHUNK_KB", "256")) * 1024
+# Stored files never change under a document ID, but clients must
+# revalidate so access checks still apply
+DOWNLOAD_CACHE_CONTROL = os.getenv("DOWNLOAD_CACHE_CONTROL", "private, no-cache")
+# Long enough for a viewer to keep paging through a large file with Range requests
+DOWNLOAD_URL_TTL_SECONDS = int(os.getenv("DOWNLOAD_URL_TTL_SECONDS", "900"))
+# Must be shared by every API process; the random fallback only suits a single one
+DOWNLOAD_URL_SECRET = os.getenv("DOWNLOAD_URL_SECRET") or secrets.token_hex(32)
+
+
+def _download_signature(document_id, expires):
+    message = f"{document_id}:{expires}".encode("utf-8")
+    return hmac.new(DOWNLOAD_URL_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def sign_download(document_id, ttl=DOWNLOAD_URL_TTL_SECONDS):
+    """
+    Create a token that lets whoever holds it fetch one document's file until it expires
+
+    Tokens last between ttl and twice ttl.
+
+    Returns:
+        str: Token for the file URL's token query parameter
+    """
+    # Expiry is rounded up to a whole period so repeat opens get the same URL,
+    # which the browser's cache (and its ETag revalidation) is keyed on
+    expires = (int(time.time()) // ttl + 2) * ttl
+    return f"{expires}.{_download_signature(document_id, expires)}"
+
+
+def verify_download_token(document_id, token):
+    """True if token was signed for this document and hasn't expired"""
+    expires, _, signature = (token or "").partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _download_signature(document_id, int(expires)))
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised for a Range header that doesn't overlap the file"""
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header
+
+    Multiple ranges aren't supported; for those the whole file is sent,
+    which RFC 9110 allows.
+
+    Args:
+        header (str): Range header value, e.g. "bytes=0-1023"
+        size (int): File size in bytes
+
+    Returns:
+        tuple: (first byte, last byte) inclusive, or None to send the whole file
+
+    Raises:
+        RangeNotSatisfiable: If the range lies outside the file
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    if size == 0:
+        raise RangeNotSatisfiable()
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header, etag, weak=True):
+    # If-None-Match compares weakly, If-Range strongly
+    for candidate in (value.strip() for value in header.split(",")):
+        if candidate == "*":
+            return True
+        if weak:
+            candidate = candidate[2:] if candidate.startswith("W/") else candidate
+            if candidate == (etag[2:] if etag.startswith("W/") else etag):
+                return True
+        elif candidate == etag and not etag.startswith("W/"):
+            return True
+    return False
+
+
+class RangeFileResponse(FileResponse):
+    """FileResponse that sends bytes [start, end] of the file, zero-copy where the server allows"""
+
+    def __init__(self, path, start, end, **kwargs):
+        super().__init__(path, **kwargs)
+        self.start = start
+        self.end = end
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        count = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if count > 0 and "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.wrapped,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False
+                })
+                return
+            await file.seek(self.start)
+            while count > 0:
+                chunk = await file.read(min(DOWNLOAD_CHUNK_BYTES, count))
+                if not chunk:
+                    # File shrank underneath us; end the response rather than hang
+                    break
+                count -= len(chunk)
+                if count > 0:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                else:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": False})
+                    return
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def file_download_response(request, file_path, filename, content_hash=None, media_type=None):
+    """
+    Build the response for downloading a stored file
+
+    Handles If-None-Match (304), If-Range and single Range requests (206/416).
+
+    Args:
+        request (Request): The incoming request
+        file_path (str): Path to the stored file
+        filename (str): Name to offer the browser
+        content_hash (str, optional): SHA-256 of the file, for a strong ETag
+        media_type (str, optional): Content type, guessed from the filename by default
+
+    Returns:
+        Response: 200, 206, 304 or 416 response
+
+    Raises:
+        FileNotFoundError: If the file is missing
+    """
+    stat_result = await anyio.to_thread.run_sync(os.stat, file_path)
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise FileNotFoundError(file_path)
+    size = stat_result.st_size
+
+    if content_hash:
+        etag = f'"{content_hash}"'
+    else:
+        # Files stored before content hashing only get a weak validator
+        etag = f'W/"{int(stat_result.st_mtime)}-{size}"'
+    headers = {
+        "etag": etag,
+        "accept-ranges": "bytes",
+        "cache-control": DOWNLOAD_CACHE_CONTROL,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True)
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and request.method in ("GET", "HEAD"):
+        if_range = request.headers.get("if-range")
+        # A stale If-Range means the client's partial copy is out of date: send it all
+        if not if_range or _etag_matches(if_range, etag, weak=False):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+
+    response_options = dict(
+        filename=filename,
+        media_type=media_type,
+        method=request.method,
+        content_disposition_type="inline",
+        stat_result=stat_result
+    )
+    status_code = 206
+    if byte_range is None:
+        status_code = 200
+        byte_range = (0, size - 1)
+    else:
+        headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+
+    start, end = byte_range
+    response = RangeFileResponse(
+        file_path, start, end,
+        status_code=status_code,
+        headers=headers,
+        **response_options
+    )
+    # Override the full-file length set from stat_result
+    response.headers["content-length"] = str(end - start + 1)
+    return response
@@ -0,0 +1,295 @@
+# backend/app/job_queue.py
+"""
+Durable document-processing queue in a local SQLite file.
+
+The API enqueues jobs and separate worker processes (app/worker.py) lease
+them. A lease expires unless the worker renews it, so a job whose worker
+crashed or hung becomes available again. Failed jobs are retried with
+exponential backoff until they run out of attempts.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "./storage/queue/jobs.sqlite")
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+
+_COLUMNS = (
+    "id", "document_id", "batch_id", "status", "attempts", "max_attempts", "available_at",
+    "lease_owner", "lease_expires_at", "last_error", "created_at", "started_at", "finished_at"
+)
+
+
+class JobQueue:
+    """SQLite-backed job queue with leases and retries"""
+
+    def __init__(self, path=JOB_QUEUE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Autocommit; writes that must be atomic open their own transaction
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, document_id TEXT NOT NULL, batch_id TEXT, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+            "available_at REAL NOT NULL, lease_owner TEXT, lease_expires_at REAL, last_error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(status, available_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_document ON jobs(document_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_batch ON jobs(batch_id)")
+
+    def _row(self, row):
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def enqueue(self, document_id, batch_id=None, max_attempts=JOB_MAX_ATTEMPTS):
+        """
+        Queue a document for processing
+
+        A document that already has a queued or running job isn't queued twice.
+
+        Args:
+            document_id (str): Document to process
+            batch_id (str, optional): Batch the job belongs to
+            max_attempts (int): Attempts before the job is marked failed
+
+        Returns:
+            dict: The new or existing job
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs "
+                    "WHERE document_id = ? AND status IN ('queued', 'leased')",
+                    (document_id,)
+                ).fetchone()
+                if existing:
+                    self._conn.execute("COMMIT")
+                    return self._row(existing)
+                job_id = str(uuid.uuid4())
+                self._conn.execute(
+                    "INSERT INTO jobs (id, document_id, batch_id, status, attempts, max_attempts, "
+                    "available_at, created_at) VALUES (?, ?, ?, 'queued', 0, ?, ?, ?)",
+                    (job_id, document_id, batch_id, max_attempts, now, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(job_id)
+
+    def lease(self, owner, lease_seconds=JOB_LEASE_SECONDS):
+        """
+        Take the oldest ready job, or one whose lease has expired
+
+        Args:
+            owner (str): Worker identity, required to renew or finish the job
+            lease_seconds (float): How long the job is ours without renewing
+
+        Returns:
+            dict: The leased job, or None if nothing is ready
+        """
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two workers can't pick the same row
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases on a last attempt are left for fail_expired
+                row = self._conn.execute(
+                    "SELECT id FROM jobs "
+                    "WHERE (status = 'queued' AND available_at <= ?) "
+                    "OR (status = 'leased' AND lease_expires_at < ? AND attempts < max_attempts) "
+                    "ORDER BY available_at LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if not row:
+                    self._conn.execute("COMMIT")
+                    return None
+                job_id = row[0]
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires_at = ?, "
+                    "attempts = attempts + 1, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (owner, now + lease_seconds, now, job_id)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(job_id)
+
+    def fail_expired(self):
+        """
+        Give up on jobs whose lease ran out on their last attempt
+
+        Their worker died or hung, so it won't report the failure itself;
+        the caller should mark the documents failed.
+
+        Returns:
+            list: The jobs marked failed
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                job_ids = [row[0] for row in self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'leased' AND lease_expires_at < ? "
+                    "AND attempts >= max_attempts",
+                    (now,)
+                )]
+                self._conn.executemany(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, lease_owner = NULL, "
+                    "last_error = COALESCE(last_error, 'Lease expired') WHERE id = ?",
+                    [(now, job_id) for job_id in job_ids]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [self.get(job_id) for job_id in job_ids]
+
+    def renew(self, job_id, owner, lease_seconds=JOB_LEASE_SECONDS):
+        """
+        Extend a lease while the job is still being worked on
+
+        Returns:
+            bool: False if the lease was lost to another worker
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (time.time() + lease_seconds, job_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, owner):
+        """Mark a leased job done"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, lease_owner = NULL, last_error = NULL "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (time.time(), job_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, owner, error):
+        """
+        Record a failed attempt; the job is retried later unless it's out of attempts
+
+        Returns:
+            str: The job's new status, "queued" or "failed"
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ?",
+                    (job_id, owner)
+                ).fetchone()
+                if not row:
+                    self._conn.execute("COMMIT")
+                    return None
+                attempts, max_attempts = row
+                if attempts >= max_attempts:
+                    status, available_at, finished_at = "failed", now, now
+                else:
+                    status, finished_at = "queued", None
+                    available_at = now + JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, available_at = ?, finished_at = ?, lease_owner = NULL, "
+                    "lease_expires_at = NULL, last_error = ? WHERE id = ?",
+                    (status, available_at, finished_at, str(error)[:2000], job_id)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return status
+
+    def cancel_batch(self, batch_id):
+        """
+        Cancel a batch's jobs that haven't started; running ones finish
+
+        Returns:
+            list: IDs of the documents whose jobs were cancelled
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                document_ids = [row[0] for row in self._conn.execute(
+                    "SELECT document_id FROM jobs WHERE batch_id = ? AND status = 'queued'", (batch_id,)
+                ).fetchall()]
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE batch_id = ? AND status = 'queued'",
+                    (time.time(), batch_id)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return document_ids
+
+    def get(self, job_id):
+        with self._lock:
+            return self._row(self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone())
+
+    def latest_for_document(self, document_id):
+        """
+        Return the most recent job for a document, or None
+        """
+        with self._lock:
+            return self._row(self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE document_id = ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (document_id,)
+            ).fetchone())
+
+    def counts(self, batch_id=None):
+        """
+        Count jobs by status, for the whole queue or one batch
+
+        Returns:
+            dict: Status -> number of jobs
+        """
+        query = "SELECT status, COUNT(*) FROM jobs"
+        params = ()
+        if batch_id:
+            query += " WHERE batch_id = ?"
+            params = (batch_id,)
+        with self._lock:
+            return dict(self._conn.execute(query + " GROUP BY status", params).fetchall())
+
+    def batch_timing(self, batch_id):
+        """
+        Return (created, first started, last finished) timestamps for a batch
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MIN(created_at), MIN(started_at), MAX(finished_at) FROM jobs WHERE batch_id = ?",
+                (batch_id,)
+            ).fetchone()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Return the process-wide queue handle, opening the database on first use
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
@@ -2,10 +2,23 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.concurrency import run_in_threadpool
 
-from .database import init_db
+from .database import init_db, get_document_collection
 from .routes import documents, chat, users
 from .auth import get_current_user
+from .job_queue import get_job_queue
+from .storage import get_blob_store
+from ..ai.embedding_model import (
+    get_embedding_model_stats,
+    get_embedding_cache_stats,
+    get_embedding_batch_stats
+)
+from ..ai.embeddings import vector_index_cache
+from ..ai.crew import get_assistant_crew
+from ..ai.llm_cache import get_llm_cache
+from ..ai.executor import get_ai_executor_stats
+from ..ai.rate_limit import get_llm_rate_limit_stats
 
 app = FastAPI(title="Healthcare Document Management System")
 
@@ -21,7 +34,26 @@ app.add_middleware(
 async def startup_db_client():
     await init_db()
 
+@app.on_event("startup")
+async def startup_document_indexes():
+    # One document per file and patient, so concurrent identical uploads can't
+    # both insert; documents stored before content hashing have no hash
+    doc_collection = await get_document_collection()
+    await doc_collection.create_index(
+        [("content_hash", 1), ("metadata.patient_id", 1)],
+        unique=True,
+        partialFilterExpression={"content_hash": {"$type": "string"}}
+    )
+
+@app.on_event("startup")
+async def startup_ai_crews():
+    # Build the chat agents and LLM clients up front so requests don't pay for it;
+    # documents are processed by the queue workers (app/worker.py)
+    get_assistant_crew()
+
 app.include_router(users.router, prefix="/api/users", tags=["users"])
+# File downloads are opened by the browser itself and guarded by signed tokens
+app.include_router(documents.file_router, prefix="/api/documents", tags=["documents"])
 app.include_router(
     documents.router, 
     prefix="/api/documents", 
@@ -37,4 +69,19 @@ app.include_router(
 
 @app.get("/api/health")
 async def health():
-    return {"status": "healthy"}
\ No newline at end of file
+    # These read SQLite (and may open it on first use), so keep them off the event loop
+    job_queue = await run_in_threadpool(lambda: get_job_queue().counts())
+    document_storage = await run_in_threadpool(lambda: get_blob_store().stats())
+    llm_cache = await run_in_threadpool(lambda: get_llm_cache().stats())
+    return {
+        "status": "healthy",
+        "embedding_model": get_embedding_model_stats(),
+        "embedding_cache": get_embedding_cache_stats(),
+        "embedding_batching": get_embedding_batch_stats(),
+        "vector_index_cache": vector_index_cache.stats(),
+        "llm_cache": llm_cache,
+        "ai_executor": get_ai_executor_stats(),
+        "llm_rate_limit": get_llm_rate_limit_stats(),
+        "job_queue": job_queue,
+        "document_storage": document_storage
+    }
\ No newline at end of file
@@ -0,0 +1,240 @@
+# backend/app/pipeline.py
+"""
+Document processing run by the queue workers (app/worker.py).
+
+Each stage's progress is written to the document's `stages` field as it
+goes, so clients polling the status endpoint can see how far it got, and
+each stage's output is checkpointed (ai/checkpoints.py) so a retry resumes
+from the first stage that is missing or out of date.
+"""
+import asyncio
+import logging
+import os
+
+from fastapi.concurrency import run_in_threadpool
+
+from .schemas import Document, DocumentMetadata
+from .database import get_document_collection
+from ..ai.crew import get_document_crew
+from ..ai.embeddings import create_document_embeddings
+from ..ai.text_extraction import open_document_text, text_extraction_version
+from ..ai.checkpoints import get_checkpoints, fingerprint
+from ..ai.chunking import CHUNK_SIZE, CHUNK_OVERLAP
+from ..ai.embedding_model import EMBEDDING_MODEL_NAME
+from ..ai.windowing import AGENT_MAX_DOCUMENT_TOKENS, first_window, read_document_tokens
+from ..ai.agents.local_classifier import get_local_classifier
+
+logger = logging.getLogger(__name__)
+
+# Stages reported on the document record, in pipeline order
+PIPELINE_STAGES = ("text", "classification", "extraction", "compliance", "embeddings")
+# Crew tasks that finish a reported stage
+CREW_STAGES = ("classification", "extraction", "compliance")
+
+# Most recent processed documents the local classifier learns from at startup
+LOCAL_CLASSIFIER_MAX_TRAINING_DOCS = int(os.getenv("LOCAL_CLASSIFIER_MAX_TRAINING_DOCS", "2000"))
+
+
+def _train_local_classifier(documents):
+    examples = []
+    for document in documents:
+        try:
+            with open(document["file_path"], "r") as f:
+                # The classifier only ever sees the opening window
+                text = first_window(f.read(16 * 1024))
+        except (OSError, UnicodeDecodeError, KeyError):
+            continue
+        examples.append((text, document["metadata"]["document_type"]))
+    get_local_classifier().train(examples)
+
+
+async def train_local_classifier():
+    """
+    Teach the local classifier the document types already assigned in the database
+    """
+    doc_collection = await get_document_collection()
+    documents = await doc_collection.find(
+        {"processed": True, "metadata.document_type": {"$nin": ["unprocessed", "unknown"]}},
+        {"file_path": 1, "metadata.document_type": 1}
+    ).sort("upload_date", -1).to_list(length=LOCAL_CLASSIFIER_MAX_TRAINING_DOCS)
+    await run_in_threadpool(_train_local_classifier, documents)
+
+
+async def process_stored_document(document_data):
+    """
+    Run a stored document through the AI crew, index it and save the results
+
+    Args:
+        document_data (dict): The document record from the database
+
+    Returns:
+        dict: Summary of the processed document
+    """
+    document_id = document_data["_id"]
+    doc_collection = await get_document_collection()
+    stages = {stage: "pending" for stage in PIPELINE_STAGES}
+
+    async def set_stages(updates, **fields):
+        if not updates and not fields:
+            return
+        stages.update(updates)
+        await doc_collection.update_one(
+            {"_id": document_id},
+            {"$set": {**{f"stages.{stage}": state for stage, state in updates.items()}, **fields}}
+        )
+
+    await set_stages(dict(stages), status="processing")
+    try:
+        return await _run_pipeline(document_id, document_data, set_stages)
+    except Exception:
+        # Mark whatever was in flight so the failure shows up in the status endpoint
+        await set_stages({stage: "failed" for stage, state in stages.items() if state == "running"})
+        raise
+
+
+async def _run_pipeline(document_id, document_data, set_stages):
+    loop = asyncio.get_running_loop()
+
+    # Convert to Document object
+    document = Document(**document_data)
+
+    # Shared AI crew, built once at startup
+    document_crew = get_document_crew()
+
+    # Stages that already succeeded for this content, on an earlier attempt or
+    # for an identical upload, are loaded instead of run again
+    checkpoints = get_checkpoints(document.content_hash)
+    versions = {"text": text_extraction_version(), **document_crew.task_versions()}
+    precomputed = {}
+    text_path = None
+    if checkpoints:
+        for stage in CREW_STAGES:
+            result = await run_in_threadpool(checkpoints.load, stage, versions[stage])
+            if result is not None:
+                precomputed[stage] = result
+        text_path = checkpoints.path("text", versions["text"], "txt")
+    text_cached = text_path is not None and os.path.exists(text_path)
+
+    # Extraction runs in the background, page by page; the agents read the text
+    # (up to AGENT_MAX_DOCUMENT_TOKENS, if set) and embeddings stream all of it below.
+    # The text is checkpointed as soon as the last page is read, so a retry after
+    # a later stage fails doesn't OCR the document again
+    await set_stages({"text": "running", **{stage: "done" for stage in precomputed}})
+    if text_cached:
+        extracted = await run_in_threadpool(open_document_text, text_path)
+    else:
+        extracted = await run_in_threadpool(open_document_text, document.file_path, save_to=text_path)
+    try:
+        return await _process_text(
+            document_id, document, document_crew, extracted, checkpoints, versions,
+            precomputed, set_stages, loop
+        )
+    finally:
+        # Pages still queued are no use once the pipeline has stopped, unless
+        # they're being checkpointed for the retry
+        if text_cached or not text_path:
+            extracted.cancel()
+
+
+async def _process_text(document_id, document, document_crew, extracted, checkpoints, versions,
+                        precomputed, set_stages, loop):
+    missing = [stage for stage in CREW_STAGES if stage not in precomputed]
+    document_text, fields = "", {}
+    if missing:
+        document_text, truncated = await run_in_threadpool(read_document_tokens, extracted.iter_pages())
+        # Stored so a document the agents only partly read can be spotted
+        fields["text_truncated"] = truncated
+        if truncated:
+            logger.warning(
+                "Document %s is longer than AGENT_MAX_DOCUMENT_TOKENS=%d; the agents only read its start",
+                document_id, AGENT_MAX_DOCUMENT_TOKENS
+            )
+    await set_stages({
+        "text": "done" if extracted.done() else "running",
+        **{stage: "running" for stage in missing}
+    }, **fields)
+
+    def on_task_done(name, result):
+        # Called from the crew's threads; save the result there and hand the
+        # status update back to the event loop
+        if name not in CREW_STAGES:
+            return
+        if checkpoints:
+            checkpoints.save(name, versions[name], result)
+        asyncio.run_coroutine_threadsafe(set_stages({name: "done"}), loop)
+
+    # Process the document; only the missing tasks (and what they need) run
+    result = await document_crew.aprocess_document(
+        document_text, document.filename, precomputed=precomputed, on_task_done=on_task_done
+    )
+
+    # Parse AI crew results
+    classification_result = result.get("classification", {})
+    extraction_result = result.get("extraction", {})
+    compliance_result = result.get("compliance", {})
+
+    # Update document metadata
+    updated_metadata = DocumentMetadata(
+        document_type=classification_result.get("document_type", "unknown"),
+        patient_id=document.metadata.patient_id,
+        patient_name=document.metadata.patient_name,
+        doctor_name=extraction_result.get("doctor_name", document.metadata.doctor_name),
+        date_of_report=document.metadata.date_of_report,
+        # Templates return the extracted values at the top level
+        medical_values=extraction_result.get(
+            "medical_values", {} if "error" in extraction_result else extraction_result
+        ),
+        summary=extraction_result.get("summary", document.metadata.summary)
+    )
+
+    # Update tags
+    tags = [updated_metadata.document_type]
+    if not compliance_result.get("compliant", True):
+        tags.append("compliance_issue")
+
+    # Create document embeddings for semantic search
+    await set_stages({**{stage: "done" for stage in CREW_STAGES}, "embeddings": "running"})
+    embedding_metadata = {
+        "document_type": updated_metadata.document_type,
+        "patient_id": updated_metadata.patient_id,
+        "patient_name": updated_metadata.patient_name,
+        "date": updated_metadata.date_of_report.isoformat()
+    }
+    # The index is per document, so this checkpoint is too
+    embedding_stage = f"embeddings-{document_id}"
+    versions[embedding_stage] = fingerprint(
+        EMBEDDING_MODEL_NAME, CHUNK_SIZE, CHUNK_OVERLAP, versions["text"], embedding_metadata
+    )
+    index_handle = checkpoints.load(embedding_stage, versions[embedding_stage]) if checkpoints else None
+    if not (index_handle and os.path.exists(index_handle["storage_path"])):
+        storage_path = await run_in_threadpool(
+            create_document_embeddings,
+            document_id=document_id,
+            text_content=extracted.iter_pages(),
+            metadata=embedding_metadata
+        )
+        if checkpoints:
+            await run_in_threadpool(
+                checkpoints.save, embedding_stage, versions[embedding_stage], {"storage_path": storage_path}
+            )
+
+    # Update the document in the database
+    await set_stages(
+        {"text": "done", "embeddings": "done"},
+        metadata=updated_metadata.dict(),
+        processed=True,
+        status="processed",
+        error=None,
+        tags=tags
+    )
+
+    return {
+        "message": "Document processed successfully",
+        "document_id": document_id,
+        "document_type": updated_metadata.document_type,
+        "tags": tags,
+        "reused_stages": sorted(precomputed),
+        "text_extraction": extracted.stats(),
+        "timings": result.get("timings", {})
+    }
+
@@ -1,13 +1,16 @@
 # backend/app/routes/chat.py
 from fastapi import APIRouter, Depends, HTTPException, Body
-import os
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import json
+import time
 from datetime import datetime
 import uuid
 
 from ..schemas import ChatSession, ChatMessage
 from ..database import get_chat_collection, get_document_collection
 from ..auth import get_current_user
-from ...ai.crew import DoctorAssistantCrew
+from ...ai.crew import get_assistant_crew
 from ...ai.embeddings import semantic_search
 
 router = APIRouter()
@@ -118,7 +121,8 @@ async def send_message(
     ).to_list(length=100)
     
     # Perform semantic search to get relevant context
-    search_results = semantic_search(
+    search_results = await run_in_threadpool(
+        semantic_search,
         query=content,
         patient_id=session.get("patient_id"),
         k=3
@@ -131,12 +135,12 @@ async def send_message(
         for result in search_results
     ])
     
-    # Initialize the AI assistant
-    assistant_crew = DoctorAssistantCrew(os.getenv("OPENAI_API_KEY"))
+    # Shared AI assistant, built once at startup
+    assistant_crew = get_assistant_crew()
     
     # Get AI response
     try:
-        ai_response = assistant_crew.answer_query(
+        ai_response = await assistant_crew.aanswer_query(
             query=content,
             patient_id=session.get("patient_id"),
             doctor_id=session.get("doctor_id")
@@ -186,4 +190,112 @@ async def send_message(
         return {
             "user_message": user_message.dict(),
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+def _sse_event(event, data):
+    # One Server-Sent Event; data is JSON so newlines in tokens survive
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/session/{session_id}/message/stream")
+async def stream_message(
+    session_id: str,
+    content: str = Body(..., embed=True),
+    current_user = Depends(get_current_user)
+):
+    """
+    Send a message in a chat session and stream the AI response as Server-Sent Events
+
+    Emits "token" events with pieces of the answer, then a single "done"
+    event carrying the saved messages, or an "error" event. Both messages
+    are written to the session once the answer is complete.
+    """
+    # Get the session
+    chat_collection = await get_chat_collection()
+    session = await chat_collection.find_one({"_id": session_id})
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    
+    # Ensure the user has access to this session
+    if current_user.get("id") != session.get("doctor_id") and current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Unauthorized access")
+    
+    user_message = ChatMessage(
+        role="user",
+        content=content,
+        timestamp=datetime.now()
+    )
+    
+    async def events():
+        started = time.perf_counter()
+        first_token_ms = None
+        answer = []
+        try:
+            # Retrieve context before the first token; the model answers from it directly
+            search_results = await run_in_threadpool(
+                semantic_search,
+                query=content,
+                patient_id=session.get("patient_id"),
+                k=3
+            )
+            context = "\n\n".join([
+                f"Document: {result['metadata'].get('document_type', 'Unknown')} - {result['metadata'].get('date', 'Unknown date')}\n" +
+                f"Content: {result['content']}"
+                for result in search_results
+            ])
+            
+            async for token in get_assistant_crew().stream_answer(content, context):
+                if first_token_ms is None:
+                    first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+                answer.append(token)
+                yield _sse_event("token", {"content": token})
+            
+            assistant_message = ChatMessage(
+                role="assistant",
+                content="".join(answer),
+                timestamp=datetime.now()
+            )
+            await chat_collection.update_one(
+                {"_id": session_id},
+                {
+                    "$push": {
+                        "messages": {
+                            "$each": [user_message.dict(), assistant_message.dict()]
+                        }
+                    },
+                    "$set": {
+                        "updated_at": datetime.now()
+                    }
+                }
+            )
+            yield _sse_event("done", {
+                "user_message": user_message.dict(),
+                "assistant_message": assistant_message.dict(),
+                "first_token_ms": first_token_ms,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1)
+            })
+        
+        except Exception as e:
+            # If AI fails, still save the user message
+            await chat_collection.update_one(
+                {"_id": session_id},
+                {
+                    "$push": {
+                        "messages": user_message.dict()
+                    },
+                    "$set": {
+                        "updated_at": datetime.now()
+                    }
+                }
+            )
+            yield _sse_event("error", {
+                "user_message": user_message.dict(),
+                "error": str(e)
+            })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
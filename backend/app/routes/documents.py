@@ -1,19 +1,25 @@
 # backend/app/routes/documents.py
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Body, Request
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 import os
-import shutil
 from datetime import datetime
 import uuid
+from pymongo.errors import DuplicateKeyError
 
-from ..schemas import Document, DocumentMetadata
+from ..schemas import Document, DocumentMetadata, BatchProcessRequest
 from ..database import get_document_collection
 from ..auth import get_current_user
-from ...ai.crew import MedicalDocumentCrew
-from ...ai.embeddings import create_document_embeddings
+from ..job_queue import get_job_queue
+from ..storage import get_blob_store, UploadTooLarge
+from ..batch import start_batch_job, get_batch_progress, cancel_batch_job
+from ..downloads import file_download_response, sign_download, verify_download_token, DOWNLOAD_URL_TTL_SECONDS
+from ...ai.embeddings import delete_document_embeddings
 
 router = APIRouter()
+# Mounted without the user dependency; requests carry a signed token instead
+file_router = APIRouter()
 
 @router.post("/upload")
 async def upload_document(
@@ -26,18 +32,17 @@ async def upload_document(
     """
     Upload a medical document for processing
     """
-    # Create storage directory if it doesn't exist
-    os.makedirs("./storage/documents", exist_ok=True)
-    
-    # Generate a unique document ID
+    # Stream the file into content-addressed storage, hashing it on the way
     document_id = str(uuid.uuid4())
-    
-    # Save the file
     file_extension = os.path.splitext(file.filename)[1]
-    file_path = f"./storage/documents/{document_id}{file_extension}"
+    blob_store = get_blob_store()
+    try:
+        content_hash, file_path, file_size = await blob_store.save_upload(file, file_extension)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    doc_collection = await get_document_collection()
+    upload_notes = [{"text": notes, "uploaded_at": datetime.now()}] if notes else []
     
     # Initial metadata
     metadata = DocumentMetadata(
@@ -55,36 +60,139 @@ async def upload_document(
         id=document_id,
         filename=file.filename,
         file_path=file_path,
+        content_hash=content_hash,
+        file_size=file_size,
         upload_date=datetime.now(),
         metadata=metadata,
         processed=False,
-        tags=["unprocessed"]
+        status="queued",
+        tags=["unprocessed"],
+        upload_notes=upload_notes
     )
     
-    # Save to database
-    doc_collection = await get_document_collection()
-    await doc_collection.insert_one(document.dict(by_alias=True))
+    # Save to database; the same file uploaded again for the same patient is
+    # the same document, which the unique (content_hash, patient_id) index enforces
+    try:
+        await doc_collection.insert_one(document.dict(by_alias=True))
+    except DuplicateKeyError:
+        await run_in_threadpool(blob_store.release, content_hash)
+        return await _upload_duplicate(doc_collection, content_hash, patient_id, upload_notes)
     
-    # Process document asynchronously
-    # In a production environment, this would be a background task
-    # For demonstration, we'll do it synchronously
+    # Hand the document to the queue workers; poll /{document_id}/status for progress
+    job = await run_in_threadpool(get_job_queue().enqueue, document_id)
     
     return JSONResponse(
         status_code=202,
         content={
-            "message": "Document uploaded and processing started",
+            "message": "Document uploaded and queued for processing",
             "document_id": document_id,
-            "status": "processing"
+            "job_id": job["id"],
+            "status": "queued",
+            "duplicate": False
         }
     )
 
+async def _upload_duplicate(doc_collection, content_hash, patient_id, upload_notes):
+    # Keep the new upload's notes, and give a document that never finished
+    # processing another go
+    query = {"content_hash": content_hash, "metadata.patient_id": patient_id}
+    projection = {"_id": 1, "status": 1, "processed": 1}
+    if upload_notes:
+        existing = await doc_collection.find_one_and_update(
+            query, {"$push": {"upload_notes": {"$each": upload_notes}}}, projection=projection
+        )
+    else:
+        existing = await doc_collection.find_one(query, projection)
+    if not existing:
+        # Deleted between the insert and here
+        raise HTTPException(status_code=409, detail="Document was deleted while uploading; try again")
+    
+    document_id = existing["_id"]
+    status = existing.get("status", "uploaded")
+    job = None
+    if not existing.get("processed"):
+        job = await run_in_threadpool(get_job_queue().enqueue, document_id)
+        if status not in ("queued", "processing"):
+            status = "queued"
+            await doc_collection.update_one({"_id": document_id}, {"$set": {"status": status}})
+    
+    return {
+        "message": "Document already uploaded" if job is None else "Document already uploaded; queued for processing",
+        "document_id": document_id,
+        "job_id": job["id"] if job else None,
+        "status": status,
+        "duplicate": True
+    }
+
+@router.post("/batch/process")
+async def process_documents_batch(
+    request: BatchProcessRequest = Body(...),
+    current_user = Depends(get_current_user)
+):
+    """
+    Process many documents in the background, by ID or for a whole patient
+    """
+    if not request.document_ids and not request.patient_id:
+        raise HTTPException(status_code=400, detail="Provide document_ids or patient_id")
+    
+    query = {}
+    if request.document_ids:
+        query["_id"] = {"$in": request.document_ids}
+    if request.patient_id:
+        query["metadata.patient_id"] = request.patient_id
+    if not request.reprocess:
+        query["processed"] = False
+    
+    doc_collection = await get_document_collection()
+    documents = await doc_collection.find(query, {"_id": 1}).to_list(length=None)
+    document_ids = [document["_id"] for document in documents]
+    
+    batch_id = await run_in_threadpool(start_batch_job, document_ids)
+    await doc_collection.update_many({"_id": {"$in": document_ids}}, {"$set": {"status": "queued"}})
+    
+    return {
+        "message": "Batch queued for processing",
+        "job_id": batch_id,
+        "total": len(document_ids)
+    }
+
+@router.get("/batch/{job_id}")
+async def batch_progress(
+    job_id: str,
+    current_user = Depends(get_current_user)
+):
+    """
+    Get progress, throughput and ETA of a batch processing job
+    """
+    progress = await run_in_threadpool(get_batch_progress, job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    
+    return progress
+
+@router.delete("/batch/{job_id}")
+async def cancel_batch(
+    job_id: str,
+    current_user = Depends(get_current_user)
+):
+    """
+    Stop a batch job from starting any more documents
+    """
+    if not await run_in_threadpool(get_batch_progress, job_id):
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    
+    cancelled = await run_in_threadpool(cancel_batch_job, job_id)
+    doc_collection = await get_document_collection()
+    await doc_collection.update_many({"_id": {"$in": cancelled}}, {"$set": {"status": "uploaded"}})
+    return {"message": "Batch job cancelled", "job_id": job_id, "cancelled": len(cancelled)}
+
 @router.get("/{document_id}/process")
 async def process_document(
     document_id: str,
     current_user = Depends(get_current_user)
 ):
     """
-    Process a previously uploaded document
+    Queue a previously uploaded document for (re)processing
     """
     # Get the document from the database
     doc_collection = await get_document_collection()
@@ -93,87 +201,53 @@ async def process_document(
     if not document_data:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Convert to Document object
-    document = Document(**document_data)
-    
-    # Read the document content
-    # In a real implementation, you would use appropriate document loaders
-    # based on file type (PDF, DOCX, etc.)
-    try:
-        with open(document.file_path, "r") as f:
-            document_text = f.read()
-    except:
-        # If we can't read the file directly (e.g., it's a binary format)
-        document_text = "Sample document text for processing"
-    
-    # Initialize the AI crew
-    document_crew = MedicalDocumentCrew(os.getenv("OPENAI_API_KEY"))
+    job = await run_in_threadpool(get_job_queue().enqueue, document_id)
+    await doc_collection.update_one({"_id": document_id}, {"$set": {"status": "queued"}})
     
-    # Process the document
-    result = document_crew.process_document(document_text, document.filename)
-    
-    # Extract the results
-    try:
-        # Parse AI crew results
-        classification_result = result.get("classification", {})
-        extraction_result = result.get("extraction", {})
-        compliance_result = result.get("compliance", {})
-        
-        # Update document metadata
-        updated_metadata = DocumentMetadata(
-            document_type=classification_result.get("document_type", "unknown"),
-            patient_id=document.metadata.patient_id,
-            patient_name=document.metadata.patient_name,
-            doctor_name=extraction_result.get("doctor_name", document.metadata.doctor_name),
-            date_of_report=document.metadata.date_of_report,
-            medical_values=extraction_result.get("medical_values", {}),
-            summary=extraction_result.get("summary", document.metadata.summary)
-        )
-        
-        # Update tags
-        tags = [updated_metadata.document_type]
-        if not compliance_result.get("compliant", True):
-            tags.append("compliance_issue")
-        
-        # Create document embeddings for semantic search
-        create_document_embeddings(
-            document_id=document_id,
-            text_content=document_text,
-            metadata={
-                "document_type": updated_metadata.document_type,
-                "patient_id": updated_metadata.patient_id,
-                "patient_name": updated_metadata.patient_name,
-                "date": updated_metadata.date_of_report.isoformat()
-            }
-        )
-        
-        # Update the document in the database
-        await doc_collection.update_one(
-            {"_id": document_id},
-            {
-                "$set": {
-                    "metadata": updated_metadata.dict(),
-                    "processed": True,
-                    "tags": tags
-                }
-            }
-        )
-        
-        return {
-            "message": "Document processed successfully",
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "Document queued for processing",
             "document_id": document_id,
-            "document_type": updated_metadata.document_type,
-            "tags": tags
+            "job_id": job["id"],
+            "status": "queued"
         }
+    )
+
+@router.get("/{document_id}/status")
+async def get_document_status(
+    document_id: str,
+    current_user = Depends(get_current_user)
+):
+    """
+    Get the processing status of a document, stage by stage
+    """
+    doc_collection = await get_document_collection()
+    document = await doc_collection.find_one(
+        {"_id": document_id},
+        {"status": 1, "stages": 1, "processed": 1, "text_truncated": 1, "error": 1}
+    )
     
-    except Exception as e:
-        return JSONResponse(
-            status_code=500,
-            content={
-                "message": "Error processing document",
-                "error": str(e)
-            }
-        )
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    job = await run_in_threadpool(get_job_queue().latest_for_document, document_id)
+    
+    return {
+        "document_id": document_id,
+        "status": document.get("status", "processed" if document.get("processed") else "uploaded"),
+        "processed": document.get("processed", False),
+        "stages": document.get("stages", {}),
+        "error": document.get("error"),
+        "text_truncated": document.get("text_truncated"),
+        "job": {
+            "job_id": job["id"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "max_attempts": job["max_attempts"],
+            "last_error": job["last_error"]
+        } if job else None
+    }
 
 @router.get("/patient/{patient_id}")
 async def get_patient_documents(
@@ -192,6 +266,57 @@ async def get_patient_documents(
         "documents": documents
     }
 
+@router.get("/{document_id}/file-url")
+async def get_document_file_url(
+    document_id: str,
+    current_user = Depends(get_current_user)
+):
+    """
+    Get a short-lived URL the browser can open the original file with directly
+    """
+    doc_collection = await get_document_collection()
+    if not await doc_collection.find_one({"_id": document_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    return {
+        "url": f"/api/documents/{document_id}/file?token={sign_download(document_id)}",
+        "expires_in": DOWNLOAD_URL_TTL_SECONDS
+    }
+
+@file_router.api_route("/{document_id}/file", methods=["GET", "HEAD"])
+async def download_document_file(
+    document_id: str,
+    request: Request,
+    token: Optional[str] = None
+):
+    """
+    Stream the original uploaded file, with Range and conditional GET support
+    
+    Opened by the browser or its PDF viewer with a token from /file-url, so
+    they can make their own Range and conditional requests.
+    """
+    if not verify_download_token(document_id, token):
+        raise HTTPException(status_code=403, detail="Download link is invalid or has expired")
+    
+    doc_collection = await get_document_collection()
+    document = await doc_collection.find_one(
+        {"_id": document_id},
+        {"file_path": 1, "filename": 1, "content_hash": 1}
+    )
+    
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    try:
+        return await file_download_response(
+            request,
+            document["file_path"],
+            document.get("filename") or os.path.basename(document["file_path"]),
+            content_hash=document.get("content_hash")
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Document file not found")
+
 @router.get("/{document_id}")
 async def get_document(
     document_id: str,
@@ -206,4 +331,38 @@ async def get_document(
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    return document
\ No newline at end of file
+    return document
+
+@router.delete("/{document_id}")
+async def delete_document(
+    document_id: str,
+    current_user = Depends(get_current_user)
+):
+    """
+    Delete a document and remove its chunks from semantic search
+    """
+    doc_collection = await get_document_collection()
+    document = await doc_collection.find_one({"_id": document_id})
+    
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    # Tombstone the chunks; the patient index is compacted in the background
+    removed_chunks = await run_in_threadpool(
+        delete_document_embeddings,
+        document_id,
+        patient_id=document.get("metadata", {}).get("patient_id")
+    )
+    
+    await doc_collection.delete_one({"_id": document_id})
+    if document.get("content_hash"):
+        # Other documents may share the stored file; it goes when the last one does
+        await run_in_threadpool(get_blob_store().release, document["content_hash"])
+    elif os.path.exists(document.get("file_path", "")):
+        os.remove(document["file_path"])
+    
+    return {
+        "message": "Document deleted",
+        "document_id": document_id,
+        "removed_chunks": removed_chunks
+    }
\ No newline at end of file
@@ -36,10 +36,17 @@ class Document(BaseModel):
     id: Optional[str] = None
     filename: str
     file_path: str
+    content_hash: Optional[str] = None  # SHA-256 of the file; identical uploads share one stored copy
+    file_size: Optional[int] = None
     upload_date: datetime = Field(default_factory=datetime.now)
     metadata: DocumentMetadata
     processed: bool = False
+    status: str = "uploaded"  # "uploaded", "queued", "processing", "processed", "failed"
+    error: Optional[str] = None  # Why processing failed, once the queue has given up on it
+    stages: Dict[str, str] = {}  # Pipeline stage -> "pending", "running", "done" or "failed"
+    text_truncated: Optional[bool] = None  # True if AGENT_MAX_DOCUMENT_TOKENS cut the agents' text short
     tags: List[str] = []
+    upload_notes: List[Dict[str, Any]] = []  # Notes sent with each upload of this file, including duplicates
     
     class Config:
         populate_by_name = True
@@ -59,4 +66,9 @@ class ChatSession(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.now)
     
     class Config:
-        populate_by_name = True
\ No newline at end of file
+        populate_by_name = True
+
+class BatchProcessRequest(BaseModel):
+    document_ids: Optional[List[str]] = None
+    patient_id: Optional[str] = None
+    reprocess: bool = False  # Also process documents that were already processed
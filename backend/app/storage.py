@@ -0,0 +1,171 @@
+# backend/app/storage.py
+"""
+Content-addressed storage for uploaded documents.
+
+Uploads are streamed to a temporary file in chunks while their SHA-256 is
+computed, then moved to a path derived from the hash. Identical files are
+stored once; a reference count in SQLite tracks how many documents point
+at each blob, and the file is removed when the last one is deleted.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from fastapi.concurrency import run_in_threadpool
+
+STORAGE_BLOB_DIR = os.getenv("STORAGE_BLOB_DIR", "./storage/documents")
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_MB", "100")) * 1024 * 1024
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_KB", "1024")) * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload goes past UPLOAD_MAX_BYTES"""
+
+
+class BlobStore:
+    """Files stored by content hash, with reference counts"""
+
+    def __init__(self, root=STORAGE_BLOB_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(root, "blobs.sqlite"), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "hash TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, "
+            "refcount INTEGER NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _blob_path(self, content_hash, extension):
+        # Two levels of fan-out keep directories small
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash + extension.lower())
+
+    async def save_upload(self, upload, extension="", max_bytes=UPLOAD_MAX_BYTES):
+        """
+        Stream an upload into the store, hashing it on the way
+
+        Args:
+            upload (UploadFile): The uploaded file
+            extension (str): File extension to keep on the stored blob
+            max_bytes (int): Largest upload accepted
+
+        Returns:
+            tuple: (content hash, stored path, size in bytes)
+
+        Raises:
+            UploadTooLarge: If the upload is bigger than max_bytes
+        """
+        digest = hashlib.sha256()
+        size = 0
+        temp_path = os.path.join(self.root, "tmp", str(uuid.uuid4()))
+        f = await run_in_threadpool(open, temp_path, "wb")
+        try:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload is larger than the {max_bytes} byte limit")
+                digest.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+            await run_in_threadpool(f.close)
+            content_hash = digest.hexdigest()
+            path = await run_in_threadpool(self._add, temp_path, content_hash, size, extension)
+        except BaseException:
+            f.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return content_hash, path, size
+
+    def _add(self, temp_path, content_hash, size, extension):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT path FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+                if row and os.path.exists(row[0]):
+                    # Already stored; keep the existing copy
+                    path = row[0]
+                    os.remove(temp_path)
+                    self._conn.execute("UPDATE blobs SET refcount = refcount + 1 WHERE hash = ?", (content_hash,))
+                else:
+                    path = self._blob_path(content_hash, extension)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(temp_path, path)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO blobs (hash, path, size, refcount, created_at) "
+                        "VALUES (?, ?, ?, COALESCE((SELECT refcount FROM blobs WHERE hash = ?), 0) + 1, ?)",
+                        (content_hash, path, size, content_hash, time.time())
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return path
+
+    def release(self, content_hash):
+        """
+        Drop one reference to a blob, deleting the file when none are left
+
+        Returns:
+            bool: True if the file was deleted
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT path, refcount FROM blobs WHERE hash = ?", (content_hash,)
+                ).fetchone()
+                if not row:
+                    self._conn.execute("COMMIT")
+                    return False
+                path, refcount = row
+                if refcount > 1:
+                    self._conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE hash = ?", (content_hash,))
+                    self._conn.execute("COMMIT")
+                    return False
+                self._conn.execute("DELETE FROM blobs WHERE hash = ?", (content_hash,))
+                # Still under the lock, so a concurrent upload of the same file can't lose its copy
+                if os.path.exists(path):
+                    os.remove(path)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def stats(self):
+        with self._lock:
+            blobs, references, stored_bytes, referenced_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(refcount), 0), COALESCE(SUM(size), 0), "
+                "COALESCE(SUM(size * refcount), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "blobs": blobs,
+            "references": references,
+            "stored_bytes": stored_bytes,
+            # Bytes that would be on disk without deduplication
+            "referenced_bytes": referenced_bytes
+        }
+
+
+_blob_store = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    """
+    Return the process-wide blob store, opening its database on first use
+    """
+    global _blob_store
+    with _blob_store_lock:
+        if _blob_store is None:
+            _blob_store = BlobStore()
+        return _blob_store
@@ -0,0 +1,127 @@
+# backend/app/worker.py
+"""
+Document-processing worker, run separately from the API.
+
+Leases jobs from the durable queue (app/job_queue.py) and runs them through
+the pipeline, renewing the lease while a document is in flight. Start as
+many processes as the LLM quota allows; each one has its own rate limiter,
+so split LLM_REQUESTS_PER_MINUTE and LLM_TOKENS_PER_MINUTE between them.
+
+Usage:
+    python -m backend.app.worker --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+
+from fastapi.concurrency import run_in_threadpool
+
+from .database import init_db, get_document_collection
+from .job_queue import get_job_queue, JOB_LEASE_SECONDS
+from .pipeline import process_stored_document, train_local_classifier
+from ..ai.crew import get_document_crew
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+# Seconds to wait before asking again when the queue is empty
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "1"))
+
+
+async def _renew_lease(queue, job_id, owner):
+    # Renew well before the lease runs out so a slow document isn't taken over;
+    # returns once the lease is lost
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        if not await run_in_threadpool(queue.renew, job_id, owner):
+            return
+
+
+async def _mark_failed(doc_collection, document_id, error):
+    await doc_collection.update_one(
+        {"_id": document_id},
+        {"$set": {"status": "failed", "error": str(error)[:2000]}}
+    )
+
+
+async def _run_job(queue, job, owner):
+    doc_collection = await get_document_collection()
+    renewer = asyncio.create_task(_renew_lease(queue, job["id"], owner))
+    try:
+        document_data = await doc_collection.find_one({"_id": job["document_id"]})
+        if not document_data:
+            # Deleted while queued; nothing to retry
+            await run_in_threadpool(queue.complete, job["id"], owner)
+            return
+        pipeline = asyncio.create_task(process_stored_document(document_data))
+        await asyncio.wait({pipeline, renewer}, return_when=asyncio.FIRST_COMPLETED)
+        if not pipeline.done():
+            # The lease was lost: another worker has the job or the queue gave
+            # up on it, so stop before writing results alongside it. A stage
+            # already running in a thread finishes, but nothing after it runs
+            pipeline.cancel()
+            return
+        pipeline.result()
+        await run_in_threadpool(queue.complete, job["id"], owner)
+    except Exception as e:
+        status = await run_in_threadpool(queue.fail, job["id"], owner, e)
+        if status == "failed":
+            await _mark_failed(doc_collection, job["document_id"], e)
+        elif status == "queued":
+            await doc_collection.update_one({"_id": job["document_id"]}, {"$set": {"status": "queued"}})
+    finally:
+        renewer.cancel()
+
+
+async def _work(queue, owner, stopping):
+    doc_collection = await get_document_collection()
+    while not stopping.is_set():
+        # Jobs whose worker died on their last attempt would otherwise leave
+        # their documents "processing" forever
+        for expired in await run_in_threadpool(queue.fail_expired):
+            await _mark_failed(doc_collection, expired["document_id"], expired["last_error"])
+        job = await run_in_threadpool(queue.lease, owner)
+        if not job:
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=WORKER_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await _run_job(queue, job, owner)
+
+
+async def run_worker(concurrency=WORKER_CONCURRENCY):
+    """
+    Process queued documents until SIGINT or SIGTERM
+
+    Jobs already leased are finished before the worker exits.
+
+    Args:
+        concurrency (int): Documents this process works on at once
+    """
+    await init_db()
+    get_document_crew()
+    await train_local_classifier()
+
+    queue = get_job_queue()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    base_owner = f"{socket.gethostname()}:{os.getpid()}"
+    await asyncio.gather(*(
+        _work(queue, f"{base_owner}:{i}", stopping) for i in range(max(1, concurrency))
+    ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process queued documents")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY,
+                        help="Documents in flight at once in this process")
+    args = parser.parse_args(argv)
+    asyncio.run(run_worker(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# backend/benchmarks/load_test.py
+"""
+End-to-end load generator for the upload -> process -> chat flow.
+
+Each virtual user uploads a synthetic medical document, waits for the
+queue workers to process it, opens a chat session for the patient and asks a few questions, timing
+every request. Run the backend against mock_llm_server so no real model
+is called; the mock's own counters are then used to separate time spent
+"in the model" from our overhead.
+
+Usage:
+    python -m backend.benchmarks.mock_llm_server --latency-ms 800 &
+    OPENAI_API_BASE=http://127.0.0.1:8010/v1 OPENAI_API_KEY=mock uvicorn backend.app.main:app &
+    OPENAI_API_BASE=http://127.0.0.1:8010/v1 OPENAI_API_KEY=mock python -m backend.app.worker &
+    python -m backend.benchmarks.load_test --users 20 --iterations 5 --stream --output load.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import httpx
+
+from .retrieval_benchmark import synthetic_document, synthetic_queries, _percentiles, _git_commit
+
+
+class Recorder:
+    """Per-endpoint latencies and failures"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def record(self, endpoint, seconds, status):
+        self.statuses.setdefault(endpoint, {})
+        self.statuses[endpoint][status] = self.statuses[endpoint].get(status, 0) + 1
+        if 200 <= status < 300:
+            self.latencies.setdefault(endpoint, []).append(seconds * 1000)
+        else:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, wall_seconds):
+        endpoints = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            samples = self.latencies.get(endpoint, [])
+            endpoints[endpoint] = {
+                "ok": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "statuses": {str(code): n for code, n in self.statuses.get(endpoint, {}).items()},
+                "per_second": round(len(samples) / wall_seconds, 3) if wall_seconds else 0.0,
+                "latency_ms": _percentiles(samples) if samples else None
+            }
+        return endpoints
+
+
+async def _timed(recorder, endpoint, request):
+    started = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        recorder.record(endpoint, time.perf_counter() - started, 599)
+        return None
+    recorder.record(endpoint, time.perf_counter() - started, response.status_code)
+    return response
+
+
+async def _stream_chat(client, recorder, session_id, question):
+    # Time to first token and to the end of the stream, from the SSE endpoint
+    started = time.perf_counter()
+    first_token = None
+    status = 599
+    try:
+        async with client.stream(
+            "POST", f"/api/chat/session/{session_id}/message/stream", json={"content": question}
+        ) as response:
+            status = response.status_code
+            async for line in response.aiter_lines():
+                if first_token is None and line.startswith("event: token"):
+                    first_token = time.perf_counter() - started
+                if line.startswith("event: error"):
+                    status = 500
+    except httpx.HTTPError:
+        pass
+    recorder.record("chat_stream", time.perf_counter() - started, status)
+    if first_token is not None:
+        recorder.record("chat_stream_first_token", first_token, 200)
+
+
+async def _wait_processed(client, recorder, document_id, started, poll_seconds=0.5, timeout=600):
+    # Upload-to-processed time, as a client polling the status endpoint sees it
+    while time.perf_counter() - started < timeout:
+        response = await _timed(recorder, "status", client.get(f"/api/documents/{document_id}/status"))
+        if response is not None and response.status_code == 200:
+            status = response.json()["status"]
+            if status in ("processed", "failed"):
+                recorder.record("process", time.perf_counter() - started, 200 if status == "processed" else 500)
+                return status == "processed"
+        await asyncio.sleep(poll_seconds)
+    recorder.record("process", time.perf_counter() - started, 504)
+    return False
+
+
+async def _virtual_user(client, recorder, user_index, iterations, questions, stream, rng):
+    completed = 0
+    for iteration in range(iterations):
+        patient_id = f"load-{user_index}-{iteration}"
+        _, _, text = synthetic_document(rng, user_index * 1000 + iteration, rng.randint(1500, 8000))
+
+        uploaded = time.perf_counter()
+        response = await _timed(recorder, "upload", client.post(
+            "/api/documents/upload",
+            files={"file": (f"{patient_id}.txt", text.encode("utf-8"), "text/plain")},
+            data={"patient_id": patient_id, "patient_name": f"Load Test {user_index}"}
+        ))
+        if response is None or response.status_code >= 300:
+            continue
+        document_id = response.json()["document_id"]
+
+        if not await _wait_processed(client, recorder, document_id, uploaded):
+            continue
+
+        # The session route takes the patient ID as the whole JSON body
+        response = await _timed(recorder, "create_session", client.post("/api/chat/sessions", json=patient_id))
+        if response is None or response.status_code >= 300:
+            continue
+        session_id = response.json()["session_id"]
+
+        for question in rng.sample(questions, min(3, len(questions))):
+            if stream:
+                await _stream_chat(client, recorder, session_id, question)
+            else:
+                await _timed(recorder, "chat", client.post(
+                    f"/api/chat/session/{session_id}/message", json=question
+                ))
+        completed += 1
+    return completed
+
+
+async def _mock_stats(mock_url):
+    if not mock_url:
+        return None
+    try:
+        async with httpx.AsyncClient(base_url=mock_url, timeout=10) as client:
+            return (await client.get("/mock/stats")).json()
+    except httpx.HTTPError:
+        return None
+
+
+async def run_load(base_url, users, iterations, token=None, mock_url=None, stream=False, seed=7, timeout=300):
+    """
+    Drive the full flow with concurrent virtual users
+
+    Args:
+        base_url (str): Backend URL
+        users (int): Concurrent virtual users
+        iterations (int): Flows per user
+        token (str, optional): Bearer token for the API
+        mock_url (str, optional): Mock LLM server URL, for model-time accounting
+        stream (bool): Use the streaming chat endpoint
+        seed (int): RNG seed for the synthetic documents and questions
+        timeout (float): Per-request timeout in seconds
+
+    Returns:
+        dict: Per-endpoint throughput and latency percentiles, plus model time
+    """
+    rng = random.Random(seed)
+    questions = synthetic_queries(rng, 50)
+    recorder = Recorder()
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=users * 2, max_keepalive_connections=users * 2)
+
+    mock_before = await _mock_stats(mock_url)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout, limits=limits) as client:
+        completed = await asyncio.gather(*(
+            _virtual_user(client, recorder, i, iterations, questions, stream, random.Random(seed + i))
+            for i in range(users)
+        ))
+        health = await client.get("/api/health")
+    wall_seconds = time.perf_counter() - started
+    mock_after = await _mock_stats(mock_url)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "users": users,
+        "iterations": iterations,
+        "stream": stream,
+        "wall_seconds": round(wall_seconds, 3),
+        "flows_completed": sum(completed),
+        "flows_per_minute": round(sum(completed) / wall_seconds * 60, 2) if wall_seconds else 0.0,
+        "endpoints": recorder.report(wall_seconds),
+        "server_health": health.json() if health.status_code == 200 else None
+    }
+
+    if mock_before and mock_after:
+        model_requests = mock_after["requests"] - mock_before["requests"]
+        model_seconds = mock_after["model_seconds"] - mock_before["model_seconds"]
+        request_seconds = sum(sum(samples) for endpoint, samples in recorder.latencies.items()
+                              if endpoint != "chat_stream_first_token") / 1000
+        report["model"] = {
+            "requests": model_requests,
+            "errors_429": mock_after["errors_429"] - mock_before["errors_429"],
+            "errors_500": mock_after["errors_500"] - mock_before["errors_500"],
+            "model_seconds": round(model_seconds, 3),
+            "requests_per_flow": round(model_requests / sum(completed), 2) if sum(completed) else None,
+            # Model calls inside one request can overlap, so this is an upper bound on model
+            # time per request and the overhead below is a lower bound
+            "request_seconds": round(request_seconds, 3),
+            "overhead_seconds": round(max(0.0, request_seconds - model_seconds), 3)
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the upload -> process -> chat flow")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mock-url", default="http://127.0.0.1:8010",
+                        help="Mock LLM server, for separating model time; empty to skip")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=3, help="Flows per user")
+    parser.add_argument("--token", default=None, help="Bearer token for the API")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming chat endpoint")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", default=None, help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load(
+        args.base_url, args.users, args.iterations,
+        token=args.token, mock_url=args.mock_url or None, stream=args.stream,
+        seed=args.seed, timeout=args.timeout
+    ))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# backend/benchmarks/mock_llm_server.py
+"""
+OpenAI-compatible stand-in for load tests and offline CI.
+
+Serves /v1/chat/completions (plain and streaming) and /v1/completions with
+templated answers shaped like what each agent expects: a document type for
+the classifier, a JSON object for the extractor, an assessment for the
+compliance reviewer and prose for the assistant. Latency is drawn from a
+configurable distribution, and a share of requests can fail with 429 or
+500 to exercise retries and backoff.
+
+Point the backend at it with:
+    OPENAI_API_BASE=http://127.0.0.1:8010/v1 OPENAI_API_KEY=mock
+
+Usage:
+    python -m backend.benchmarks.mock_llm_server --latency-ms 800 --latency-dist lognormal --error-429 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class MockSettings:
+    """Latency, streaming and error injection settings"""
+
+    def __init__(self, latency_ms=500.0, latency_dist="fixed", latency_sigma=0.5,
+                 token_ms=20.0, error_429=0.0, error_500=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.token_ms = token_ms
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.rng = random.Random(seed)
+
+    def sample_latency(self):
+        """Seconds before the first token, drawn from the configured distribution"""
+        if self.latency_dist == "uniform":
+            ms = self.rng.uniform(0, 2 * self.latency_ms)
+        elif self.latency_dist == "exponential":
+            ms = self.rng.expovariate(1 / self.latency_ms) if self.latency_ms else 0.0
+        elif self.latency_dist == "lognormal":
+            # Median of latency_ms with a long right tail, like real model latency
+            ms = self.latency_ms * self.rng.lognormvariate(0, self.latency_sigma)
+        else:
+            ms = self.latency_ms
+        return ms / 1000
+
+    def sample_error(self):
+        roll = self.rng.random()
+        if roll < self.error_429:
+            return 429
+        if roll < self.error_429 + self.error_500:
+            return 500
+        return None
+
+
+def _answer_for(prompt):
+    """Pick a canned answer in the shape the calling agent parses"""
+    lowered = prompt.lower()
+    if "classification expert" in lowered or "classify it into" in lowered:
+        return "Blood Test Report\nIdentifiers: MRN 000000, collected 2023-09-15"
+    if "json" in lowered and "extract" in lowered:
+        return json.dumps({
+            "patient_name": "Test Patient",
+            "date_of_collection": "2023-09-15",
+            "ordering_physician": "Dr. Mock",
+            "test_results": [
+                {"test": "Glucose", "value": 142, "unit": "mg/dL", "reference_range": "70-99", "flag": "High"},
+                {"test": "HbA1c", "value": 7.2, "unit": "%", "reference_range": "4.0-5.6", "flag": "High"}
+            ],
+            "notes": "Synthetic response from the mock LLM server"
+        })
+    if "hipaa" in lowered or "compliance" in lowered:
+        return "Compliant. The excerpt contains PHI (patient name) that should be access-controlled."
+    return (
+        "Based on the available records, the most recent glucose was 142 mg/dL, above the "
+        "reference range, and the patient was started on Metformin 500mg once daily. "
+        "Consider repeating HbA1c in three months."
+    )
+
+
+def _prompt_from(body):
+    if "messages" in body:
+        return "\n".join(str(message.get("content", "")) for message in body["messages"])
+    prompt = body.get("prompt", "")
+    return "\n".join(prompt) if isinstance(prompt, list) else str(prompt)
+
+
+def _usage(prompt, answer):
+    # Rough token counts; enough for client-side accounting
+    prompt_tokens = len(prompt) // 4 + 1
+    completion_tokens = len(answer) // 4 + 1
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+def create_app(settings):
+    """
+    Build the mock server app
+
+    Args:
+        settings (MockSettings): Latency and error injection settings
+
+    Returns:
+        FastAPI: The app
+    """
+    app = FastAPI(title="Mock OpenAI server")
+    stats = {"requests": 0, "streamed": 0, "errors_429": 0, "errors_500": 0, "model_seconds": 0.0}
+    stats_lock = threading.Lock()
+
+    def count(key, amount=1):
+        with stats_lock:
+            stats[key] += amount
+
+    def error_response(status):
+        count(f"errors_{status}")
+        message = "Rate limit reached for requests" if status == 429 else "The server had an error"
+        headers = {"retry-after": "1"} if status == 429 else {}
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": message, "type": "mock_error", "code": status}},
+            headers=headers
+        )
+
+    def stream_pieces(answer):
+        # Roughly one token per word, keeping the separating spaces
+        words = answer.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    async def complete(request, chat):
+        body = await request.json()
+        count("requests")
+        status = settings.sample_error()
+        if status:
+            return error_response(status)
+
+        model = body.get("model", "gpt-4")
+        prompt = _prompt_from(body)
+        answer = _answer_for(prompt)
+        completion_id = f"mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        latency = settings.sample_latency()
+
+        if body.get("stream"):
+            count("streamed")
+
+            async def events():
+                started = time.perf_counter()
+                await asyncio.sleep(latency)
+                for piece in stream_pieces(answer):
+                    if chat:
+                        choice = {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+                    else:
+                        choice = {"index": 0, "text": piece, "finish_reason": None}
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk" if chat else "text_completion",
+                        "created": created,
+                        "model": model,
+                        "choices": [choice]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(settings.token_ms / 1000)
+                final = {"index": 0, "delta": {}, "finish_reason": "stop"} if chat else \
+                    {"index": 0, "text": "", "finish_reason": "stop"}
+                yield "data: " + json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk" if chat else "text_completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [final]
+                }) + "\n\n"
+                yield "data: [DONE]\n\n"
+                count("model_seconds", time.perf_counter() - started)
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        # Non-streaming answers take the first-token latency plus generation time
+        seconds = latency + len(stream_pieces(answer)) * settings.token_ms / 1000
+        await asyncio.sleep(seconds)
+        count("model_seconds", seconds)
+        if chat:
+            choice = {"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}
+        else:
+            choice = {"index": 0, "text": answer, "finish_reason": "stop", "logprobs": None}
+        return {
+            "id": completion_id,
+            "object": "chat.completion" if chat else "text_completion",
+            "created": created,
+            "model": model,
+            "choices": [choice],
+            "usage": _usage(prompt, answer)
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await complete(request, chat=True)
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        return await complete(request, chat=False)
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "gpt-4", "object": "model", "owned_by": "mock"}]}
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        with stats_lock:
+            snapshot = dict(stats)
+        snapshot["model_seconds"] = round(snapshot["model_seconds"], 3)
+        return snapshot
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Typical time to first token")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "exponential", "lognormal"], default="fixed")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Spread of the lognormal distribution")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="Delay per generated token")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--error-500", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    settings = MockSettings(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_sigma=args.latency_sigma,
+        token_ms=args.token_ms,
+        error_429=args.error_429,
+        error_500=args.error_500,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
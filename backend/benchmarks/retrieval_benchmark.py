@@ -0,0 +1,238 @@
+# backend/benchmarks/retrieval_benchmark.py
+"""
+Retrieval benchmark over synthetic patient corpora.
+
+Builds a patient index of a given number of chunks through the normal
+create_document_embeddings path, then measures build time, cold and warm
+load, query latency percentiles, recall@k against exact search and
+resident memory. Results are written as JSON so runs can be compared
+between commits.
+
+Runs offline on CPU. By default a deterministic hashing embedder stands in
+for the transformer; pass --model to use a (small) local sentence-transformer.
+
+Usage:
+    python -m backend.benchmarks.retrieval_benchmark --chunks 10 1000 100000 --output bench.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+LAB_TESTS = [
+    ("HbA1c", "%", 4.0, 12.0), ("Glucose", "mg/dL", 60, 300), ("LDL Cholesterol", "mg/dL", 50, 220),
+    ("HDL Cholesterol", "mg/dL", 20, 90), ("Creatinine", "mg/dL", 0.5, 3.0), ("Hemoglobin", "g/dL", 8, 18),
+    ("WBC", "10^3/uL", 2, 18), ("Platelets", "10^3/uL", 90, 450), ("TSH", "mIU/L", 0.2, 8.0),
+    ("Potassium", "mmol/L", 3.0, 6.0), ("Sodium", "mmol/L", 128, 150), ("ALT", "U/L", 5, 120)
+]
+MEDICATIONS = [
+    "Metformin 500mg", "Lisinopril 10mg", "Atorvastatin 20mg", "Levothyroxine 50mcg", "Amlodipine 5mg",
+    "Warfarin 5mg", "Insulin glargine 20 units", "Omeprazole 20mg", "Sertraline 50mg", "Aspirin 81mg"
+]
+FINDINGS = [
+    "No acute cardiopulmonary process.", "Mild degenerative changes of the lumbar spine.",
+    "Patient reports fatigue and increased thirst.", "Blood pressure remains above target.",
+    "Lungs clear to auscultation bilaterally.", "Small hiatal hernia noted.",
+    "Follow-up recommended in three months.", "Diet and exercise counseling provided."
+]
+DOCUMENT_TYPES = ["Blood Test Report", "Radiology Report", "Prescription", "Doctor Progress Note"]
+
+
+class HashingEmbeddings:
+    """Deterministic bag-of-words embedder: no model download, stable across runs"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def embed_query(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def synthetic_document(rng, doc_index, target_chars):
+    """Generate a plausible medical document of roughly target_chars characters"""
+    document_type = rng.choice(DOCUMENT_TYPES)
+    lines = [
+        f"{document_type}",
+        f"MRN: {rng.randint(100000, 999999)}  Date: 2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        f"Ordering Physician: Dr. {rng.choice(['Patel', 'Nguyen', 'Garcia', 'Smith', 'Okafor'])}",
+        ""
+    ]
+    size = sum(len(line) for line in lines)
+    while size < target_chars:
+        kind = rng.random()
+        if kind < 0.5:
+            name, unit, low, high = rng.choice(LAB_TESTS)
+            line = f"{name}: {round(rng.uniform(low, high), 1)} {unit} (ref {low}-{high})"
+        elif kind < 0.75:
+            line = f"Medication: {rng.choice(MEDICATIONS)} {rng.choice(['daily', 'twice daily', 'at bedtime'])}"
+        else:
+            line = rng.choice(FINDINGS)
+        lines.append(line)
+        size += len(line) + 1
+    return f"doc-{doc_index:06d}", document_type, "\n".join(lines)
+
+
+def synthetic_queries(rng, n_queries):
+    templates = [
+        lambda: f"What was the latest {rng.choice(LAB_TESTS)[0]} value?",
+        lambda: f"Is the patient taking {rng.choice(MEDICATIONS).split()[0]}?",
+        lambda: f"{rng.choice(LAB_TESTS)[0]} trend over the last year",
+        lambda: rng.choice(FINDINGS)
+    ]
+    return [rng.choice(templates)() for _ in range(n_queries)]
+
+
+def _rss_mb():
+    # Current resident set from /proc where available, otherwise peak RSS
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentiles(samples_ms):
+    return {
+        "p50": round(float(np.percentile(samples_ms, 50)), 3),
+        "p95": round(float(np.percentile(samples_ms, 95)), 3),
+        "p99": round(float(np.percentile(samples_ms, 99)), 3),
+        "mean": round(float(np.mean(samples_ms)), 3)
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_corpus(embeddings_module, n_chunks, n_queries, k, seed):
+    """Build one patient corpus of about n_chunks chunks and measure it"""
+    from ..ai.vector_index import recall_report
+
+    rng = random.Random(seed)
+    patient_id = f"bench-{n_chunks}"
+    # Aim for ~50 documents per corpus, each a whole number of chunks
+    chunks_per_doc = max(1, n_chunks // 50)
+    n_docs = max(1, n_chunks // chunks_per_doc)
+    doc_chars = chunks_per_doc * 800
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    for doc_index in range(n_docs):
+        document_id, document_type, text = synthetic_document(rng, doc_index, doc_chars)
+        embeddings_module.create_document_embeddings(
+            document_id, text, {"patient_id": patient_id, "document_type": document_type}
+        )
+    build_seconds = time.perf_counter() - started
+
+    # Cold load: drop the cached index so the next access hits disk
+    embeddings_module._invalidate_patient(patient_id)
+    started = time.perf_counter()
+    vectorstore = embeddings_module.get_vectorstore(patient_id)
+    embeddings_module.get_lexical_index(patient_id)
+    cold_load_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    embeddings_module.get_vectorstore(patient_id)
+    warm_load_ms = (time.perf_counter() - started) * 1000
+
+    queries = synthetic_queries(rng, n_queries)
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        embeddings_module.semantic_search(query, patient_id=patient_id, k=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    storage_path = embeddings_module._patient_index_path(patient_id)
+    raw_vectors = embeddings_module._load_raw_vectors(storage_path, vectorstore.index.d)
+    index_type = embeddings_module._read_index_meta(storage_path).get("index_type", "flat")
+    recall = recall_report(raw_vectors, index_types=(index_type,), k=k, n_queries=min(n_queries, 200), seed=seed)
+
+    return {
+        "chunks": int(vectorstore.index.ntotal),
+        "documents": n_docs,
+        "index_type": index_type,
+        "build_seconds": round(build_seconds, 3),
+        "build_chunks_per_second": round(vectorstore.index.ntotal / build_seconds, 1) if build_seconds else None,
+        "cold_load_ms": round(cold_load_ms, 3),
+        "warm_load_ms": round(warm_load_ms, 3),
+        "query_latency_ms": _percentiles(latencies),
+        "recall_at_k": recall["index_types"][index_type],
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_growth_mb": round(_rss_mb() - rss_before, 1)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark patient retrieval on synthetic corpora")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10, 1000, 10000],
+                        help="Corpus sizes to benchmark, in chunks per patient")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per corpus")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--model", default=None,
+                        help="Local sentence-transformer to use instead of the hashing embedder")
+    parser.add_argument("--index-type", default=None, help="Override VECTOR_INDEX_TYPE")
+    parser.add_argument("--storage-dir", default=None, help="Where to build indexes (default: temp dir)")
+    parser.add_argument("--output", default=None, help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    # Storage and model settings are read at import time, so set them first
+    storage_dir = args.storage_dir or tempfile.mkdtemp(prefix="retrieval-bench-")
+    os.environ["VECTOR_STORAGE_DIR"] = os.path.join(storage_dir, "vectors")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(storage_dir, "embeddings.sqlite")
+    if args.model:
+        os.environ["EMBEDDING_MODEL_NAME"] = args.model
+    if args.index_type:
+        os.environ["VECTOR_INDEX_TYPE"] = args.index_type
+
+    from ..ai import embedding_model
+    from ..ai import embeddings as embeddings_module
+
+    if not args.model:
+        embedding_model.set_embedding_model(HashingEmbeddings())
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "embedder": args.model or "hashing",
+        "index_type": args.index_type or os.getenv("VECTOR_INDEX_TYPE", "flat"),
+        "k": args.k,
+        "corpora": []
+    }
+    for n_chunks in args.chunks:
+        results["corpora"].append(
+            run_corpus(embeddings_module, n_chunks, args.queries, args.k, args.seed)
+        )
+    results["embedding_model"] = embedding_model.get_embedding_model_stats()
+    results["embedding_cache"] = embedding_model.get_embedding_cache_stats()
+    results["embedding_batching"] = embedding_model.get_embedding_batch_stats()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
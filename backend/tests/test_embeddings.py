@@ -0,0 +1,26 @@
+# backend/tests/test_embeddings.py
+import pytest
+from langchain.embeddings.fake import DeterministicFakeEmbedding
+
+from backend.ai import embeddings
+
+
+@pytest.fixture
+def vector_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(embeddings, "VECTOR_STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(embeddings, "_MANIFEST_PATH", str(tmp_path / "documents.json"))
+    monkeypatch.setattr(embeddings, "_LOCK_DIR", str(tmp_path / "locks"))
+    monkeypatch.setattr(embeddings, "get_embeddings", lambda: DeterministicFakeEmbedding(size=16))
+    return tmp_path
+
+
+def test_search_after_every_document_is_deleted_and_compacted(vector_storage):
+    text = "Hemoglobin 13.2 g/dL, platelets normal. " * 50
+    embeddings.create_document_embeddings("doc-1", text, {"patient_id": "patient-1"})
+    assert embeddings.semantic_search("hemoglobin", patient_id="patient-1")
+
+    assert embeddings.delete_document_embeddings("doc-1", "patient-1") > 0
+    embeddings.compact_patient_index("patient-1")
+
+    assert embeddings.get_vectorstore("patient-1").index.ntotal == 0
+    assert embeddings.semantic_search("hemoglobin", patient_id="patient-1") == []
@@ -49,6 +49,34 @@ export default function ChatInterface() {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [messages]);
 
+  // Read Server-Sent Events from a fetch response body
+  const readEvents = async (response, onEvent) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      
+      // Events are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        
+        let event = 'message';
+        let data = '';
+        rawEvent.split('\n').forEach((line) => {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        if (data) onEvent(event, JSON.parse(data));
+      }
+    }
+  };
+
   const handleSendMessage = async (e) => {
     e.preventDefault();
     
@@ -56,29 +84,55 @@ export default function ChatInterface() {
     
     setSending(true);
     
+    // Show the question and an empty answer straight away; tokens fill it in
+    const pendingUserMessage = { role: 'user', content: newMessage, timestamp: new Date().toISOString() };
+    const pendingAnswer = { role: 'assistant', content: '', timestamp: new Date().toISOString() };
+    const previousMessages = messages;
+    setMessages([...previousMessages, pendingUserMessage, pendingAnswer]);
+    
     try {
-      const response = await axios.post(`/api/chat/session/${sessionId}/message`, {
-        content: newMessage
+      const response = await fetch(`/api/chat/session/${sessionId}/message/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          Accept: 'text/event-stream',
+          ...(axios.defaults.headers.common.Authorization
+            ? { Authorization: axios.defaults.headers.common.Authorization }
+            : {}),
+        },
+        body: JSON.stringify({ content: newMessage }),
       });
       
-      // Add both user and assistant messages
-      if (response.data.user_message && response.data.assistant_message) {
-        setMessages([...messages, response.data.user_message, response.data.assistant_message]);
-      } else if (response.data.user_message) {
-        setMessages([...messages, response.data.user_message]);
-        // Show error message if we got user message but no assistant message
-        if (response.data.error) {
+      if (!response.ok || !response.body) {
+        throw new Error(`Request failed with status ${response.status}`);
+      }
+      
+      setNewMessage('');
+      
+      await readEvents(response, (event, data) => {
+        if (event === 'token') {
+          setMessages((current) => {
+            const updated = [...current];
+            const last = updated[updated.length - 1];
+            updated[updated.length - 1] = { ...last, content: last.content + data.content };
+            return updated;
+          });
+        } else if (event === 'done') {
+          // Replace the placeholders with the messages as saved
+          setMessages([...previousMessages, data.user_message, data.assistant_message]);
+        } else if (event === 'error') {
+          setMessages([...previousMessages, data.user_message]);
+          // Show error message if we got user message but no assistant message
           toast({
             variant: "destructive",
             title: "AI Response Error",
             description: "The assistant couldn't generate a response. Please try again.",
           });
         }
-      }
-      
-      setNewMessage('');
+      });
     } catch (error) {
       console.error("Error sending message:", error);
+      setMessages(previousMessages);
       toast({
         variant: "destructive",
         title: "Failed to Send",
@@ -3,13 +3,15 @@ import React, { useState, useEffect } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from '../ui/card';
 import { Button } from '../ui/button';
 import { Tabs, TabsList, TabsTrigger, TabsContent } from '../ui/tabs';
-import { Printer, Download, Share2 } from 'lucide-react';
+import { Printer, Download, Share2, FileText } from 'lucide-react';
 import axios from 'axios';
 
 const ReportViewer = ({ patientId, conversationId }) => {
   const [report, setReport] = useState(null);
   const [loading, setLoading] = useState(false);
   const [activeTab, setActiveTab] = useState('summary');
+  const [documents, setDocuments] = useState([]);
+  const [openingDocument, setOpeningDocument] = useState(null);
 
   useEffect(() => {
     if (patientId && conversationId) {
@@ -17,6 +19,43 @@ const ReportViewer = ({ patientId, conversationId }) => {
     }
   }, [patientId, conversationId]);
 
+  useEffect(() => {
+    if (patientId) {
+      fetchDocuments();
+    }
+  }, [patientId]);
+
+  const fetchDocuments = async () => {
+    try {
+      const response = await axios.get(`/api/documents/patient/${patientId}`);
+      setDocuments(response.data.documents || []);
+    } catch (error) {
+      console.error('Error fetching documents:', error);
+    }
+  };
+
+  const handleOpenDocument = async (doc) => {
+    // The browser opens the file URL itself, so its PDF viewer can page with
+    // Range requests and revalidate with ETags instead of loading the whole
+    // file into memory here. Open the tab now, before the await, so it isn't
+    // treated as a popup
+    const documentId = doc._id || doc.id;
+    const viewer = window.open('', '_blank');
+    try {
+      setOpeningDocument(documentId);
+      const response = await axios.get(`/api/documents/${documentId}/file-url`);
+      if (viewer) {
+        viewer.opener = null;
+        viewer.location.href = response.data.url;
+      }
+    } catch (error) {
+      console.error('Error opening document:', error);
+      if (viewer) viewer.close();
+    } finally {
+      setOpeningDocument(null);
+    }
+  };
+
   const fetchReport = async () => {
     try {
       setLoading(true);
@@ -59,6 +98,41 @@ const ReportViewer = ({ patientId, conversationId }) => {
     window.print();
   };
 
+  const renderDocuments = () => (
+    <div className="border p-4 rounded-md">
+      <h3 className="font-medium mb-2">Source Documents</h3>
+      {documents.length === 0 ? (
+        <p className="text-muted-foreground">No documents uploaded for this patient</p>
+      ) : (
+        <ul className="space-y-2">
+          {documents.map((doc) => {
+            const documentId = doc._id || doc.id;
+            return (
+              <li key={documentId} className="flex items-center justify-between">
+                <span>
+                  {doc.filename}
+                  <span className="text-muted-foreground ml-2">
+                    {doc.metadata?.document_type}
+                    {doc.file_size ? ` · ${Math.round(doc.file_size / 1024)} KB` : ''}
+                  </span>
+                </span>
+                <Button
+                  variant="outline"
+                  size="sm"
+                  onClick={() => handleOpenDocument(doc)}
+                  disabled={openingDocument === documentId}
+                >
+                  <FileText className="h-4 w-4 mr-2" />
+                  {openingDocument === documentId ? 'Opening...' : 'View Original'}
+                </Button>
+              </li>
+            );
+          })}
+        </ul>
+      )}
+    </div>
+  );
+
   if (!patientId || !conversationId) {
     return (
       <Card className="h-full">
@@ -115,11 +189,12 @@ const ReportViewer = ({ patientId, conversationId }) => {
         ) : report ? (
           <div className="space-y-4">
             <Tabs defaultValue="summary" onValueChange={setActiveTab} value={activeTab}>
-              <TabsList className="grid grid-cols-4 mb-4">
+              <TabsList className="grid grid-cols-5 mb-4">
                 <TabsTrigger value="summary">Summary</TabsTrigger>
                 <TabsTrigger value="assessment">Assessment</TabsTrigger>
                 <TabsTrigger value="plan">Plan</TabsTrigger>
                 <TabsTrigger value="notes">Notes</TabsTrigger>
+                <TabsTrigger value="documents">Documents</TabsTrigger>
               </TabsList>
               
               <TabsContent value="summary" className="space-y-4">
@@ -175,14 +250,31 @@ const ReportViewer = ({ patientId, conversationId }) => {
                   <p>{report.followUp}</p>
                 </div>
               </TabsContent>
+              
+              <TabsContent value="documents" className="space-y-4">
+                {renderDocuments()}
+              </TabsContent>
             </Tabs>
           </div>
         ) : (
-          <div className="flex flex-col items-center justify-center gap-4 h-64">
-            <p className="text-muted-foreground">No report available for this conversation</p>
-            <Button onClick={handleGenerateReport}>
-              Generate Report
-            </Button>
+          <div className="space-y-4">
+            <div className="flex flex-col items-center justify-center gap-4 h-64">
+              <p className="text-muted-foreground">No report available for this conversation</p>
+              <Button onClick={handleGenerateReport}>
+                Generate Report
+              </Button>
+            </div>
+            {/* A patient's files stay reachable when their report couldn't be loaded */}
+            {documents.length > 0 && (
+              <Tabs value="documents">
+                <TabsList className="mb-4">
+                  <TabsTrigger value="documents">Documents</TabsTrigger>
+                </TabsList>
+                <TabsContent value="documents" className="space-y-4">
+                  {renderDocuments()}
+                </TabsContent>
+              </Tabs>
+            )}
           </div>
         )}
       </CardContent>
@@ -16,6 +16,7 @@ export default function UploadForm() {
   const [notes, setNotes] = useState('');
   const [uploading, setUploading] = useState(false);
   const [progress, setProgress] = useState(0);
+  const [stage, setStage] = useState('');
   const { toast } = useToast();
 
   const handleFileChange = (e) => {
@@ -56,36 +57,54 @@ export default function UploadForm() {
         }
       });
       
-      const { document_id } = response.data;
+      const { document_id, duplicate } = response.data;
       
       // Show success message
       toast({
-        title: "Document Uploaded",
-        description: "Your document is being processed. This may take a few moments.",
+        title: duplicate ? "Already Uploaded" : "Document Uploaded",
+        description: duplicate
+          ? "This file is already on record for this patient."
+          : "Your document is being processed. This may take a few moments.",
       });
       
-      // Poll for processing completion
+      // Poll the queue status until a worker has finished with the document
+      const resetForm = () => {
+        setFile(null);
+        setPatientId('');
+        setPatientName('');
+        setNotes('');
+        setUploading(false);
+        setProgress(0);
+        setStage('');
+      };
       const processingInterval = setInterval(async () => {
         try {
-          const processingResponse = await axios.get(`/api/documents/${document_id}`);
-          if (processingResponse.data.processed) {
+          const statusResponse = await axios.get(`/api/documents/${document_id}/status`);
+          const { status, stages, job } = statusResponse.data;
+          const running = Object.keys(stages || {}).find((name) => stages[name] === 'running');
+          setStage(running || status);
+          
+          if (status === 'processed') {
             clearInterval(processingInterval);
+            const documentResponse = await axios.get(`/api/documents/${document_id}`);
             toast({
               title: "Processing Complete",
-              description: `Document classified as: ${processingResponse.data.metadata.document_type}`,
+              description: `Document classified as: ${documentResponse.data.metadata.document_type}`,
+            });
+            resetForm();
+          } else if (status === 'failed') {
+            clearInterval(processingInterval);
+            toast({
+              variant: "destructive",
+              title: "Processing Failed",
+              description: job?.last_error || "The document could not be processed.",
             });
-            // Reset form
-            setFile(null);
-            setPatientId('');
-            setPatientName('');
-            setNotes('');
-            setUploading(false);
-            setProgress(0);
+            resetForm();
           }
         } catch (error) {
           console.error("Error checking processing status:", error);
         }
-      }, 5000); // Check every 5 seconds
+      }, 2000); // Check every 2 seconds
       
     } catch (error) {
       console.error("Error uploading document:", error);
@@ -161,7 +180,9 @@ export default function UploadForm() {
                 className="bg-blue-600 h-2.5 rounded-full" 
                 style={{ width: `${progress}%` }}
               ></div>
-              <p className="text-sm text-center mt-1">Processing document... {progress}%</p>
+              <p className="text-sm text-center mt-1">
+                {progress < 100 ? `Uploading document... ${progress}%` : `Processing document... ${stage}`}
+              </p>
             </div>
           )}
           